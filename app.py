@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from emotion_model import EmotionalAnalyzer
-import time
+from emotion_model import EmotionalAnalyzer, ResultCache
+from history_store import EmotionHistory
+import os
 
 # Page configuration
 st.set_page_config(
@@ -70,8 +71,11 @@ st.markdown("""
 def load_analyzer():
     """Load the emotional analyzer model with better error handling"""
     try:
-        with st.spinner("🔄 Loading AI models... This may take a minute."):
-            analyzer = EmotionalAnalyzer()
+        with st.spinner("🔄 Starting analyzer..."):
+            # Models load on a background thread; fallback analysis is used until then
+            # MOODAI_BUNDLE points at a model_bundle.py directory to load offline
+            analyzer = EmotionalAnalyzer(cache=ResultCache(max_entries=1000), background=True,
+                                         bundle=os.environ.get("MOODAI_BUNDLE") or None)
             return analyzer
     except Exception as e:
         st.error(f"Error loading analyzer: {e}")
@@ -110,10 +114,16 @@ def display_emotional_analysis(emotion_data, context):
 
     # Emotion distribution
     st.subheader("Emotion Distribution")
-    emotions_df = pd.DataFrame([
-        {'Emotion': emotion, 'Score': score}
-        for emotion, score in emotion_data['all_emotions'].items()
-    ])
+    fig = emotion_distribution_figure(tuple(emotion_data['all_emotions'].items()))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# Figures are cached by their inputs, so reruns of the same analysis
+# (tab switches, sidebar toggles, example clicks) skip rebuilding them
+@st.cache_data(show_spinner=False, max_entries=256)
+def emotion_distribution_figure(emotion_items):
+    """Bar chart of every emotion score"""
+    emotions_df = pd.DataFrame(list(emotion_items), columns=['Emotion', 'Score'])
 
     fig = px.bar(
         emotions_df,
@@ -124,7 +134,52 @@ def display_emotional_analysis(emotion_data, context):
         title="Emotional Profile Distribution"
     )
     fig.update_layout(showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def sentiment_gauge_figure(intensity):
+    """Gauge of the sentiment intensity"""
+    return go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=intensity * 100,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Sentiment Strength"},
+        gauge={
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 33], 'color': "lightgray"},
+                {'range': [33, 66], 'color': "gray"},
+                {'range': [66, 100], 'color': "darkgray"}
+            ],
+        }
+    ))
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def emotion_radar_figure(emotion_items):
+    """Closed radar chart of every emotion score"""
+    emotions = [emotion for emotion, _ in emotion_items]
+    scores = [score for _, score in emotion_items]
+
+    fig = go.Figure(data=go.Scatterpolar(
+        r=scores + [scores[0]],  # Close the radar
+        theta=emotions + [emotions[0]],  # Close the radar
+        fill='toself',
+        name='Emotional Profile'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )),
+        showlegend=False,
+        title="Emotional Profile Radar Chart"
+    )
+    return fig
 
 
 def display_context_analysis(context):
@@ -156,22 +211,7 @@ def display_context_analysis(context):
         st.markdown(f"Intensity: {context['intensity']:.1%}")
 
         # Sentiment gauge
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number+delta",
-            value=context['intensity'] * 100,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "Sentiment Strength"},
-            gauge={
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, 33], 'color': "lightgray"},
-                    {'range': [33, 66], 'color': "gray"},
-                    {'range': [66, 100], 'color': "darkgray"}
-                ],
-            }
-        ))
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(sentiment_gauge_figure(context['intensity']), use_container_width=True)
 
 
 def display_suggestions(suggestions):
@@ -199,34 +239,122 @@ def display_visualizations(emotion_data, context):
     """Display emotional visualizations"""
     st.subheader("📈 Emotional Visualization")
 
-    # Create radar chart for emotions
-    emotions = list(emotion_data['all_emotions'].keys())
-    scores = list(emotion_data['all_emotions'].values())
-
     # Ensure we have at least 3 emotions for radar chart
-    if len(emotions) >= 3:
-        fig = go.Figure(data=go.Scatterpolar(
-            r=scores + [scores[0]],  # Close the radar
-            theta=emotions + [emotions[0]],  # Close the radar
-            fill='toself',
-            name='Emotional Profile'
-        ))
-
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 1]
-                )),
-            showlegend=False,
-            title="Emotional Profile Radar Chart"
-        )
-
+    if len(emotion_data['all_emotions']) >= 3:
+        fig = emotion_radar_figure(tuple(emotion_data['all_emotions'].items()))
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Not enough emotion data for radar chart visualization")
 
 
+@st.cache_resource(show_spinner=False)
+def load_history():
+    """Open the on-disk emotion history store"""
+    return EmotionHistory(os.environ.get("MOODAI_HISTORY_DIR", ".history"))
+
+
+def display_trends(history, journal_name):
+    """Display stored emotion trends without re-analyzing any entries"""
+    st.subheader("📅 Your Emotional Trends")
+
+    summary = history.summary(journal_name)
+    if not summary['count']:
+        st.info("No saved entries yet. Analyze some text with history saving turned on.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="Saved Entries", value=summary['count'])
+    with col2:
+        st.metric(label="Current Daily Streak", value=f"{summary['day_streak']} days",
+                  delta=f"longest {summary['longest_day_streak']}")
+    with col3:
+        top_emotion = max(summary['dominant_counts'].items(), key=lambda x: x[1])[0]
+        st.metric(label="Most Frequent Emotion", value=top_emotion.title())
+
+    daily = history.daily_means(journal_name)
+    daily_df = pd.DataFrame(daily['means'], columns=daily['labels'], index=pd.to_datetime(daily['periods']))
+    st.markdown("**Daily average emotions**")
+    st.line_chart(daily_df.tail(90))
+
+    weekly = history.weekly_means(journal_name)
+    weekly_df = pd.DataFrame(weekly['means'], columns=weekly['labels'], index=pd.to_datetime(weekly['periods']))
+    fig = px.bar(
+        weekly_df.tail(26),
+        barmode='stack',
+        title="Weekly Emotional Mix",
+        labels={'index': 'Week', 'value': 'Average score', 'variable': 'Emotion'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    counts_df = pd.DataFrame(
+        [{'Emotion': emotion, 'Entries': count} for emotion, count in summary['dominant_counts'].items()]
+    )
+    fig = px.pie(counts_df, names='Emotion', values='Entries', title="Dominant Emotion per Entry")
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def display_timings(breakdown):
+    """Display the per-stage timing breakdown of the last analysis"""
+    if not breakdown:
+        return
+
+    with st.expander("⏱️ Timing breakdown", expanded=True):
+        timings_df = pd.DataFrame([
+            {'Stage': stage, 'Time (ms)': round(seconds * 1000, 2)}
+            for stage, seconds in breakdown.items()
+        ])
+        st.dataframe(timings_df, use_container_width=True, hide_index=True)
+
+
+def display_results(analysis, show_timings):
+    """Render a stored analysis; reruns only redraw, they never re-analyze"""
+    result = analysis['result']
+    emotion_data = result['emotion']
+    context = result['context']
+
+    if show_timings:
+        display_timings(analysis['timings'])
+
+    # Display model status
+    if analysis['fallback']:
+        st.info("ℹ️ Analysis performed using fallback methods")
+
+    incremental = result.get('incremental')
+    if incremental and incremental['sentences']:
+        st.caption(f"⚡ Re-scored {incremental['rescored']} of {incremental['sentences']} sentences")
+
+    # Create tabs for different views
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["📊 Emotional Analysis", "🎯 Context", "💡 Suggestions", "📈 Visualization"])
+
+    with tab1:
+        display_emotional_analysis(emotion_data, context)
+
+    with tab2:
+        display_context_analysis(context)
+
+    with tab3:
+        display_suggestions(result['suggestions'])
+
+    with tab4:
+        display_visualizations(emotion_data, context)
+
+
+def run_analysis(analyzer, text, incremental):
+    """Analyze text and keep the result in session state for later reruns"""
+    # Incremental analysis only re-scores sentences it has not seen before;
+    # otherwise repeated texts come from the analyzer's cache
+    result = analyzer.analyze_incremental(text) if incremental else analyzer.analyze(text)
+    st.session_state.analysis = {
+        'result': result,
+        'fallback': not analyzer.models_loaded,
+        'timings': analyzer.metrics.last_request()
+    }
+    st.session_state.analyzed_text = text
+    return result
+
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🧠 AI Emotional Journal</h1>', unsafe_allow_html=True)
@@ -239,6 +367,18 @@ def main():
         "providing personalized suggestions for emotional well-being."
     )
 
+    show_timings = st.sidebar.checkbox("⏱️ Show timing breakdown", value=False)
+    live_analysis = st.sidebar.checkbox(
+        "⚡ Live analysis", value=True,
+        help="Update the analysis whenever the text changes; only new or edited sentences are re-scored"
+    )
+
+    st.sidebar.title("Journal History")
+    journal_name = st.sidebar.text_input("Journal name", value="", placeholder="e.g. your first name").strip()
+    save_history = st.sidebar.checkbox("💾 Save analyses to my history", value=True, disabled=not journal_name)
+    show_trends = st.sidebar.checkbox("📅 Show my trends", value=False, disabled=not journal_name)
+    history = load_history()
+
     st.sidebar.title("How to Use")
     st.sidebar.write("""
     1. Enter your thoughts or feelings in the text area
@@ -258,7 +398,9 @@ def main():
     analyzer = st.session_state.analyzer
 
     # Show fallback warning if using fallback mode
-    if not analyzer.models_loaded:
+    if analyzer.load_state == 'loading':
+        st.info("🔄 AI models are loading in the background. Using fallback analysis until they're ready.")
+    elif not analyzer.models_loaded:
         st.markdown('<div class="fallback-warning">', unsafe_allow_html=True)
         st.warning("⚠️ Using fallback analysis mode. Some advanced features may be limited.")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -312,36 +454,13 @@ def main():
     # Handle analysis
     if analyze_button and st.session_state.user_text.strip():
         with st.spinner("🔍 Analyzing your emotions..."):
-            # Add small delay for better UX
-            time.sleep(0.5)
-
             try:
-                # Analyze emotions and context
-                emotion_data = analyzer.analyze_emotion(st.session_state.user_text)
-                context = analyzer.extract_context(st.session_state.user_text)
-                suggestions = analyzer.get_suggestions(emotion_data, context)
+                result = run_analysis(analyzer, st.session_state.user_text, live_analysis)
 
                 st.success("✅ Analysis Complete!")
 
-                # Display model status
-                if not analyzer.models_loaded:
-                    st.info("ℹ️ Analysis performed using fallback methods")
-
-                # Create tabs for different views
-                tab1, tab2, tab3, tab4 = st.tabs(
-                    ["📊 Emotional Analysis", "🎯 Context", "💡 Suggestions", "📈 Visualization"])
-
-                with tab1:
-                    display_emotional_analysis(emotion_data, context)
-
-                with tab2:
-                    display_context_analysis(context)
-
-                with tab3:
-                    display_suggestions(suggestions)
-
-                with tab4:
-                    display_visualizations(emotion_data, context)
+                if journal_name and save_history:
+                    history.append(journal_name, result['emotion'])
 
             except Exception as e:
                 st.error(f"❌ Error during analysis: {str(e)}")
@@ -350,6 +469,23 @@ def main():
     elif analyze_button and not st.session_state.user_text.strip():
         st.warning("⚠️ Please enter some text to analyze.")
 
+    elif live_analysis and st.session_state.user_text.strip() \
+            and st.session_state.get('analyzed_text') != st.session_state.user_text:
+        # The text changed since the last analysis: refresh without a button press
+        try:
+            run_analysis(analyzer, st.session_state.user_text, incremental=True)
+        except Exception as e:
+            st.error(f"❌ Error during analysis: {str(e)}")
+
+    # The last analysis stays on screen across reruns (example clicks,
+    # sidebar toggles) without being recomputed
+    if 'analysis' in st.session_state:
+        display_results(st.session_state.analysis, show_timings)
+
+    if journal_name and show_trends:
+        st.markdown("---")
+        display_trends(history, journal_name)
+
 
 if __name__ == "__main__":
     main()
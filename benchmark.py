@@ -0,0 +1,331 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import resource
+import numpy as np
+
+from emotion_model import EmotionalAnalyzer, EMOTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+EMOTION_LABELS = ['anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise']
+SENTIMENT_LABELS = ['NEGATIVE', 'POSITIVE']
+
+SAMPLE_SENTENCES = [
+    "I'm so excited about my vacation next week!",
+    "I can't wait to relax on the beach with Sarah Johnson.",
+    "I'm really frustrated with my team at work.",
+    "They never listen to my ideas and I feel ignored.",
+    "I feel lonely and isolated lately.",
+    "I miss spending time with my friends in Chicago.",
+    "The news about climate change makes me worried about the future.",
+    "I accomplished all my goals today and feel incredibly proud of myself!",
+    "Going to the doctor tomorrow makes me nervous.",
+    "My brother surprised me with tickets to the concert."
+]
+
+# Approximate words per input for each size bucket
+INPUT_SIZES = {'short': 10, 'medium': 100, 'long': 5000}
+
+# Metrics where larger is better; everything else is compared as smaller-is-better
+HIGHER_IS_BETTER = {'texts_per_sec'}
+
+
+def make_texts(size, count, seed=0):
+    """Deterministic journal-like texts of roughly INPUT_SIZES[size] words"""
+    rng = random.Random(f"{size}-{seed}")
+    target_words = INPUT_SIZES[size]
+    texts = []
+    for _ in range(count):
+        words = []
+        while len(words) < target_words:
+            words.extend(rng.choice(SAMPLE_SENTENCES).split())
+        texts.append(" ".join(words[:target_words]))
+    return texts
+
+
+def build_tiny_model(path, labels):
+    """Save a tiny randomly initialized RoBERTa classifier for offline runs
+
+    The scores are meaningless, but the tokenizer, pipeline and model code
+    paths are the same as for the real models.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification
+
+    vocab = {"<s>": 0, "<pad>": 1, "</s>": 2, "<unk>": 3, "<mask>": 4}
+    for sentence in SAMPLE_SENTENCES:
+        for word in sentence.lower().split():
+            vocab.setdefault(word.strip(".,!?"), len(vocab))
+
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<s>",
+        eos_token="</s>",
+        unk_token="<unk>",
+        pad_token="<pad>",
+        mask_token="<mask>",
+        model_max_length=512
+    ).save_pretrained(path)
+
+    config = RobertaConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=520,
+        pad_token_id=1,
+        num_labels=len(labels),
+        id2label=dict(enumerate(labels)),
+        label2id={label: i for i, label in enumerate(labels)}
+    )
+    RobertaForSequenceClassification(config).save_pretrained(path)
+    return path
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(latencies, texts_processed):
+    latencies = np.asarray(latencies)
+    return {
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'texts_per_sec': float(texts_processed / latencies.sum()) if latencies.sum() else 0.0,
+        'calls': int(len(latencies))
+    }
+
+
+def time_calls(fn, args_list, repeat):
+    """Call fn(*args) for every args in args_list, repeat times; return latencies"""
+    latencies = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_stages(analyzer, texts, repeat):
+    """Time each analysis stage on its own and the full pipeline end to end"""
+    # Precompute stage inputs so each timing covers only its own stage
+    emotion_data = [analyzer.analyze_emotion(text) for text in texts]
+    contexts = [analyzer.extract_context(text) for text in texts]
+
+    stages = {
+        'analyze_emotion': (analyzer.analyze_emotion, [(text,) for text in texts]),
+        'extract_context': (analyzer.extract_context, [(text,) for text in texts]),
+        'extract_entities': (analyzer.extract_entities, [(text,) for text in texts]),
+        'get_suggestions': (analyzer.get_suggestions, list(zip(emotion_data, contexts))),
+        'pipeline': (analyzer.analyze_uncached, [(text,) for text in texts])
+    }
+
+    results = {}
+    for stage, (fn, args_list) in stages.items():
+        results[stage] = summarize(time_calls(fn, args_list, repeat), len(args_list) * repeat)
+    return results
+
+
+def bench_batches(analyzer, texts, batch_sizes, repeat):
+    """Throughput of analyze_batch_uncached at several batch sizes"""
+    results = {}
+    for batch_size in batch_sizes:
+        batches = [(texts[start:start + batch_size], batch_size) for start in range(0, len(texts), batch_size)]
+        latencies = time_calls(analyzer.analyze_batch_uncached, batches, repeat)
+        results[f'batch_{batch_size}'] = summarize(latencies, len(texts) * repeat)
+    return results
+
+
+def run_suite(modes, sizes, batch_sizes, count, repeat, analyzer_kwargs):
+    """Run every benchmark and return a machine-readable report"""
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'count': count,
+            'repeat': repeat
+        },
+        'results': {}
+    }
+
+    start = time.perf_counter()
+    analyzer = EmotionalAnalyzer(**analyzer_kwargs)
+    load_seconds = time.perf_counter() - start
+    models_loaded = analyzer.models_loaded
+
+    for mode in modes:
+        if mode in ('model', 'cascade') and not models_loaded:
+            logger.warning(f"Models failed to load; skipping {mode} mode")
+            continue
+
+        # Fallback mode reuses the same analyzer with the models switched off
+        analyzer.models_loaded = models_loaded and mode != 'fallback'
+        analyzer.cascade = mode == 'cascade'
+        mode_results = {'load_seconds': load_seconds if mode == 'model' else 0.0}
+
+        for size in sizes:
+            texts = make_texts(size, count)
+            logger.info(f"Benchmarking {mode} mode on {size} inputs...")
+            mode_results[size] = bench_stages(analyzer, texts, repeat)
+            mode_results[size].update(bench_batches(analyzer, texts, batch_sizes, repeat))
+
+        mode_results['peak_rss_mb'] = peak_rss_mb()
+        if mode == 'cascade':
+            mode_results['routing'] = analyzer.cascade_stats()
+        report['results'][mode] = mode_results
+
+    analyzer.models_loaded = models_loaded
+    analyzer.cascade = False
+    return report
+
+
+def print_cascade_report(report):
+    print(f"{report['texts']} texts: fast path {report['fast_seconds_per_text'] * 1000:.2f}ms/text, "
+          f"models {report['model_seconds_per_text'] * 1000:.2f}ms/text")
+    print(f"fast path only: emotion accuracy {report['fast_only']['emotion_accuracy']:.3f}, "
+          f"sentiment agreement {report['fast_only']['sentiment_agreement']:.3f}")
+    print("threshold  margin  escalated  emotion acc  sentiment agr  ms/text  cost vs models")
+    for setting in report['settings']:
+        print(f"{setting['threshold']:9.2f}  {setting['margin']:6.2f}  {setting['escalation_rate']:9.1%}  "
+              f"{setting['emotion_accuracy']:11.3f}  {setting['sentiment_agreement']:13.3f}  "
+              f"{setting['seconds_per_text'] * 1000:7.2f}  {setting['cost_ratio']:14.2f}")
+
+
+def flatten(results, prefix=''):
+    """Flatten nested results into {'mode.size.stage.metric': value}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not name.endswith('.calls'):
+            flat[name] = value
+    return flat
+
+
+def compare(report, baseline, tolerance):
+    """List metrics that regressed by more than tolerance against a baseline"""
+    current = flatten(report['results'])
+    previous = flatten(baseline['results'])
+    regressions = []
+
+    for name, value in sorted(current.items()):
+        if name not in previous or not previous[name]:
+            continue
+        ratio = value / previous[name]
+        metric = name.rsplit('.', 1)[-1]
+        regressed = ratio < 1 - tolerance if metric in HIGHER_IS_BETTER else ratio > 1 + tolerance
+        if regressed:
+            regressions.append({'metric': name, 'baseline': previous[name], 'current': value, 'ratio': ratio})
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EmotionalAnalyzer latency, throughput and memory")
+    parser.add_argument("--modes", nargs="+", default=["model", "fallback"], choices=["model", "fallback", "cascade"])
+    parser.add_argument("--sizes", nargs="+", default=list(INPUT_SIZES), choices=list(INPUT_SIZES))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--count", type=int, default=32, help="Texts per input size (default: 32)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", default="pytorch", help="Emotion model backend")
+    parser.add_argument("--combined", action="store_true", help="Derive sentiment from the emotion model")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL)
+    parser.add_argument("--sentiment-model", default=None)
+    parser.add_argument("--tiny-models", metavar="DIR", default=None,
+                        help="Build and use tiny random stand-in models under DIR (no network needed)")
+    parser.add_argument("--cascade-report", action="store_true",
+                        help="Compare cascade thresholds against full-model labels instead of timing stages")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--margins", nargs="+", type=float, default=[0.0, 0.2, 0.3, 0.5])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before a metric counts as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    emotion_model, sentiment_model = args.emotion_model, args.sentiment_model
+    if args.tiny_models:
+        emotion_model = os.path.join(args.tiny_models, "emotion")
+        sentiment_model = os.path.join(args.tiny_models, "sentiment")
+        if not os.path.exists(os.path.join(emotion_model, "config.json")):
+            build_tiny_model(emotion_model, EMOTION_LABELS)
+        if not os.path.exists(os.path.join(sentiment_model, "config.json")):
+            build_tiny_model(sentiment_model, SENTIMENT_LABELS)
+
+    if args.cascade_report:
+        analyzer = EmotionalAnalyzer(backend=args.backend, combined=args.combined,
+                                     emotion_model=emotion_model, sentiment_model=sentiment_model)
+        if not analyzer.models_loaded:
+            logger.error("Models failed to load; the cascade report needs them")
+            return 1
+        texts = [text for size in args.sizes for text in make_texts(size, args.count)]
+        report = analyzer.cascade_report(texts, args.thresholds, args.margins)
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        logger.info(f"Cascade report written to {args.output}")
+        print_cascade_report(report)
+        return 0
+
+    report = run_suite(
+        args.modes,
+        args.sizes,
+        args.batch_sizes,
+        args.count,
+        args.repeat,
+        {
+            'backend': args.backend,
+            'combined': args.combined,
+            'emotion_model': emotion_model,
+            'sentiment_model': sentiment_model
+        }
+    )
+    report['meta'].update({'backend': args.backend, 'combined': args.combined, 'emotion_model': emotion_model})
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    for mode, mode_results in report['results'].items():
+        print(f"{mode}: load {mode_results['load_seconds']:.2f}s, peak RSS {mode_results['peak_rss_mb']:.0f} MB")
+        for size in args.sizes:
+            for name, stats in mode_results[size].items():
+                print(f"  {size:<6} {name:<17} p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+                      f"p99 {stats['p99_ms']:8.2f}ms  {stats['texts_per_sec']:9.1f} texts/sec")
+        if 'routing' in mode_results:
+            routing = mode_results['routing']
+            print(f"  routing: {routing['fast']} fast, {routing['model']} escalated "
+                  f"({routing['escalation_rate']:.1%}), {routing['seconds_per_text'] * 1000:.2f}ms scoring/text")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']:.4g} -> "
+                  f"{regression['current']:.4g} ({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
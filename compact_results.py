@@ -0,0 +1,341 @@
+import json
+import mmap
+import struct
+import numpy as np
+
+from emotion_model import SUGGESTION_TABLE
+from scoring import EmotionScores
+
+# File/IPC layout: header, JSON schema padded to 8 bytes, one fixed-size
+# record per result, then a blob of UTF-8 topic and entity strings
+MAGIC = b'EMOR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+
+# Every suggestion sentence the analyzer can produce, in a fixed order;
+# results store indices into this tuple instead of the sentences
+SUGGESTION_TEXTS = tuple(dict.fromkeys(text for suggestions in SUGGESTION_TABLE.values() for text in suggestions))
+MAX_SUGGESTIONS = max(len(suggestions) for suggestions in SUGGESTION_TABLE.values())
+
+# Marks an unused slot in the fixed-width order and suggestion fields
+UNUSED = 255
+ITEM_SEPARATOR = '\x1f'
+LIST_SEPARATOR = '\x1e'
+
+# Record flags
+HAS_EMBEDDING_KEY = 1
+HAS_EMBEDDING = 2
+
+
+class ResultSchema:
+    """Vocabularies shared by a set of compact results
+
+    Labels and sentiments get small integer ids the first time they are
+    seen. A schema is written into every encoded buffer, so a decoder never
+    depends on the label order of the models that produced the results.
+    """
+
+    __slots__ = ('labels', 'label_ids', 'sentiments', 'sentiment_ids', 'suggestions', 'suggestion_ids')
+
+    def __init__(self, labels=(), sentiments=(), suggestions=SUGGESTION_TEXTS):
+        self.labels = []
+        self.label_ids = {}
+        self.sentiments = []
+        self.sentiment_ids = {}
+        for label in labels:
+            self.label_id(label)
+        for sentiment in sentiments:
+            self.sentiment_id(sentiment)
+        self.suggestions = tuple(suggestions)
+        self.suggestion_ids = {text: i for i, text in enumerate(self.suggestions)}
+
+    def label_id(self, label):
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            if len(self.labels) >= UNUSED:
+                raise ValueError(f"Too many emotion labels for the compact format (at most {UNUSED})")
+            label_id = self.label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return label_id
+
+    def sentiment_id(self, sentiment):
+        sentiment_id = self.sentiment_ids.get(sentiment)
+        if sentiment_id is None:
+            if len(self.sentiments) >= UNUSED:
+                raise ValueError(f"Too many sentiment labels for the compact format (at most {UNUSED})")
+            sentiment_id = self.sentiment_ids[sentiment] = len(self.sentiments)
+            self.sentiments.append(sentiment)
+        return sentiment_id
+
+    def record_dtype(self, embedding_dim=0):
+        """NumPy record layout for this schema; little-endian and unpadded"""
+        n_labels = max(len(self.labels), 1)
+        fields = [
+            ('scores', '<f4', (n_labels,)),
+            ('order', 'u1', (n_labels,)),
+            ('primary', 'u1'),
+            ('sentiment', 'u1'),
+            ('flags', 'u1'),
+            ('suggestions', 'u1', (MAX_SUGGESTIONS,)),
+            ('primary_score', '<f4'),
+            ('intensity', '<f4'),
+            ('sentiment_score', '<f4'),
+            ('strings_offset', '<u4'),
+            ('strings_length', '<u4')
+        ]
+        if embedding_dim:
+            fields.append(('embedding', '<f2', (embedding_dim,)))
+        return np.dtype(fields)
+
+    def to_json(self):
+        return {'labels': self.labels, 'sentiments': self.sentiments, 'suggestions': list(self.suggestions)}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['labels'], data['sentiments'], data['suggestions'])
+
+
+class CompactResult:
+    """One analysis result without per-result label or suggestion strings
+
+    Emotion scores are packed float32 in the order the result dict listed
+    them, with the matching label ids in `order`; suggestions are ids into
+    the schema's suggestion texts. to_dict() rebuilds the analyzer's
+    {'emotion', 'context', 'suggestions'} dict. Scores come back rounded to
+    float32 and embeddings to float16; chunked-analysis timelines are not
+    kept.
+    """
+
+    __slots__ = ('schema', 'order', 'scores', 'primary', 'primary_score', 'intensity',
+                 'sentiment', 'sentiment_score', 'topics', 'entities', 'suggestions', 'embedding')
+
+    def __init__(self, schema, order, scores, primary, primary_score, intensity,
+                 sentiment, sentiment_score, topics=(), entities=(), suggestions=b'', embedding=False):
+        self.schema = schema
+        self.order = order
+        self.scores = scores
+        self.primary = primary
+        self.primary_score = primary_score
+        self.intensity = intensity
+        self.sentiment = sentiment
+        self.sentiment_score = sentiment_score
+        self.topics = topics
+        self.entities = entities
+        self.suggestions = suggestions
+        # False: the result had no 'embedding' key; None: the key held None
+        self.embedding = embedding
+
+    @classmethod
+    def from_dict(cls, result, schema):
+        """Build from an analyzer result dict, adding new labels to schema"""
+        emotion = result['emotion']
+        context = result['context']
+        all_emotions = emotion['all_emotions']
+
+        embedding = result.get('embedding', False)
+        if embedding:
+            embedding = np.asarray(embedding, dtype=np.float16).tobytes()
+
+        try:
+            suggestions = bytes(schema.suggestion_ids[text] for text in result['suggestions'])
+        except KeyError as e:
+            raise ValueError(f"Suggestion is not in the compact suggestion catalog: {e}")
+
+        return cls(
+            schema,
+            bytes(schema.label_id(label) for label in all_emotions),
+            np.array(list(all_emotions.values()), dtype=np.float32).tobytes(),
+            schema.label_id(emotion['primary_emotion']),
+            float(emotion['primary_score']),
+            float(emotion['emotional_intensity']),
+            schema.sentiment_id(context['sentiment']),
+            float(context['intensity']),
+            tuple(context['topics']),
+            tuple(context['key_entities']),
+            suggestions,
+            embedding
+        )
+
+    @property
+    def primary_emotion(self):
+        return self.schema.labels[self.primary]
+
+    @property
+    def emotion_scores(self):
+        """{label: score} in the original order"""
+        labels = self.schema.labels
+        return {labels[label_id]: score
+                for label_id, score in zip(self.order, np.frombuffer(self.scores, dtype=np.float32).tolist())}
+
+    def to_dict(self):
+        """The analyzer's result dict for this result"""
+        schema = self.schema
+        result = {
+            'emotion': {
+                'primary_emotion': schema.labels[self.primary],
+                'primary_score': self.primary_score,
+                'all_emotions': self.emotion_scores,
+                'emotional_intensity': self.intensity
+            },
+            'context': {
+                'topics': list(self.topics),
+                'sentiment': schema.sentiments[self.sentiment],
+                'intensity': self.sentiment_score,
+                'key_entities': list(self.entities)
+            },
+            'suggestions': [schema.suggestions[i] for i in self.suggestions]
+        }
+        if self.embedding is not False:
+            result['embedding'] = (np.frombuffer(self.embedding, dtype=np.float16).astype(np.float32).tolist()
+                                   if self.embedding is not None else None)
+        return result
+
+
+def compact(results, schema=None):
+    """Convert analyzer result dicts to CompactResults sharing one schema"""
+    schema = schema or ResultSchema()
+    return [CompactResult.from_dict(result, schema) for result in results]
+
+
+def encode_results(results, schema=None):
+    """Encode result dicts or CompactResults into one bytes buffer"""
+    results = list(results)
+    if schema is None:
+        first = next((result for result in results if isinstance(result, CompactResult)), None)
+        schema = first.schema if first is not None else ResultSchema()
+    # Results built against another schema are re-keyed onto this one
+    results = [result if isinstance(result, CompactResult) and result.schema is schema
+               else CompactResult.from_dict(result if isinstance(result, dict) else result.to_dict(), schema)
+               for result in results]
+
+    embedding_dim = next((len(result.embedding) // 2 for result in results if result.embedding), 0)
+    dtype = schema.record_dtype(embedding_dim)
+    records = np.zeros(len(results), dtype=dtype)
+    records['order'] = UNUSED
+    records['scores'] = np.nan
+    records['suggestions'] = UNUSED
+
+    # Scalar columns are filled in one go; only the variable-length parts loop
+    records['primary'] = [result.primary for result in results]
+    records['sentiment'] = [result.sentiment for result in results]
+    records['primary_score'] = [result.primary_score for result in results]
+    records['intensity'] = [result.intensity for result in results]
+    records['sentiment_score'] = [result.sentiment_score for result in results]
+
+    orders = records['order']
+    scores = records['scores']
+    suggestions = records['suggestions']
+    flags = records['flags']
+    strings = []
+    for row, result in enumerate(results):
+        order = np.frombuffer(result.order, dtype=np.uint8)
+        orders[row, :len(order)] = order
+        scores[row, order] = np.frombuffer(result.scores, dtype=np.float32)
+        suggestions[row, :len(result.suggestions)] = np.frombuffer(result.suggestions, dtype=np.uint8)
+
+        if result.embedding is not False:
+            flags[row] = HAS_EMBEDDING_KEY
+            if result.embedding is not None:
+                if len(result.embedding) != embedding_dim * 2:
+                    raise ValueError("All embeddings in one buffer must have the same dimension")
+                flags[row] |= HAS_EMBEDDING
+                records['embedding'][row] = np.frombuffer(result.embedding, dtype=np.float16)
+
+        strings.append((ITEM_SEPARATOR.join(result.topics) + LIST_SEPARATOR
+                        + ITEM_SEPARATOR.join(result.entities)).encode('utf-8'))
+
+    lengths = np.array([len(item) for item in strings], dtype=np.int64)
+    records['strings_length'] = lengths
+    records['strings_offset'] = np.cumsum(lengths) - lengths
+    blob = b''.join(strings)
+
+    meta = json.dumps({**schema.to_json(), 'embedding_dim': embedding_dim}).encode('utf-8')
+    meta += b' ' * (-(HEADER.size + len(meta)) % 8)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta), len(results))
+    return b''.join([header, meta, records.tobytes(), blob])
+
+
+class CompactResults:
+    """Zero-copy view over an encoded buffer (bytes, memoryview or mmap)
+
+    The fixed-size records are a NumPy structured array over the buffer
+    itself, so column access (records['scores'], records['primary']) reads
+    straight from it; CompactResult objects and dicts are only built for
+    the rows that are indexed.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, _, meta_length, count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an encoded result buffer")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact result format version: {version}")
+
+        meta = json.loads(bytes(view[HEADER.size:HEADER.size + meta_length]))
+        self.schema = ResultSchema.from_json(meta)
+        self.embedding_dim = meta['embedding_dim']
+        offset = HEADER.size + meta_length
+        self.records = np.frombuffer(view, dtype=self.schema.record_dtype(self.embedding_dim),
+                                     count=count, offset=offset)
+        self.blob = view[offset + self.records.nbytes:]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, row):
+        record = self.records[row]
+        order = record['order']
+        order = order[order != UNUSED]
+        suggestions = record['suggestions']
+
+        start = int(record['strings_offset'])
+        strings = str(self.blob[start:start + int(record['strings_length'])], 'utf-8')
+        topics, _, entities = strings.partition(LIST_SEPARATOR)
+
+        flags = int(record['flags'])
+        embedding = False
+        if flags & HAS_EMBEDDING:
+            embedding = record['embedding'].tobytes()
+        elif flags & HAS_EMBEDDING_KEY:
+            embedding = None
+
+        return CompactResult(
+            self.schema,
+            order.tobytes(),
+            record['scores'][order].tobytes(),
+            int(record['primary']),
+            float(record['primary_score']),
+            float(record['intensity']),
+            int(record['sentiment']),
+            float(record['sentiment_score']),
+            tuple(topics.split(ITEM_SEPARATOR)) if topics else (),
+            tuple(entities.split(ITEM_SEPARATOR)) if entities else (),
+            suggestions[suggestions != UNUSED].tobytes(),
+            embedding
+        )
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def emotion_scores(self):
+        """All rows as an EmotionScores; labels a result lacked score 0"""
+        return EmotionScores(self.schema.labels, np.nan_to_num(self.records['scores'], nan=0.0))
+
+    def to_dicts(self):
+        return [result.to_dict() for result in self]
+
+
+def decode_results(buffer):
+    return CompactResults(buffer)
+
+
+def save_results(path, results, schema=None):
+    with open(path, 'wb') as results_file:
+        results_file.write(encode_results(results, schema))
+
+
+def load_results(path):
+    """Memory-map an encoded results file; records are read on access"""
+    with open(path, 'rb') as results_file:
+        return CompactResults(mmap.mmap(results_file.fileno(), 0, access=mmap.ACCESS_READ))
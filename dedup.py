@@ -0,0 +1,212 @@
+import re
+import copy
+import time
+import zlib
+import logging
+import numpy as np
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Multiply-shift hashing keeps the top 32 bits of a 64-bit product
+HASH_SHIFT = np.uint64(32)
+
+
+def lsh_params(threshold, num_perm):
+    """(bands, rows) whose LSH S-curve crosses 50% closest to threshold
+
+    Two texts with Jaccard similarity s share at least one band with
+    probability 1 - (1 - s**rows)**bands; the curve's midpoint sits near
+    (1 / bands) ** (1 / rows).
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """Streaming MinHash/LSH index of representative texts
+
+    Texts are reduced to word shingles, hashed with crc32 and summarized by
+    num_perm multiply-shift MinHash values. The signature is cut into bands;
+    texts sharing any band are candidates, and a candidate only counts when
+    the estimated Jaccard similarity (the share of equal MinHash values)
+    reaches threshold. At most max_representatives are kept: the least
+    recently matched one is evicted along with its band entries, so memory
+    stays bounded on an endless stream.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, shingle_size=3, max_representatives=100000, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_representatives = max_representatives
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+        # {key: (signature, value)} in least-recently-matched order
+        self.representatives = OrderedDict()
+        # One {band bytes: key} table per band
+        self.tables = [{} for _ in range(self.bands)]
+
+    def shingles(self, text):
+        words = WORD_PATTERN.findall(text.lower())
+        if not words:
+            return []
+        size = min(self.shingle_size, len(words))
+        return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+    def signature(self, text):
+        """MinHash signature as a uint32 array, or None for a text without words"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in set(shingles)),
+                             dtype=np.uint64)
+        # (shingles, num_perm) products wrap modulo 2**64; the top 32 bits are the hash
+        values = (hashes[:, None] * self.multipliers + self.offsets) >> HASH_SHIFT
+        return values.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def find(self, signature):
+        """(key, value, similarity) of the best matching representative, or None"""
+        best = None
+        seen = set()
+        for table, band_key in zip(self.tables, self.band_keys(signature)):
+            key = table.get(band_key)
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            candidate, value = self.representatives[key]
+            similarity = float((candidate == signature).mean())
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (key, value, similarity)
+
+        if best is not None:
+            self.representatives.move_to_end(best[0])
+        return best
+
+    def add(self, key, signature, value=None):
+        """Make a text a representative; value is stored alongside (e.g. its result)"""
+        for table, band_key in zip(self.tables, self.band_keys(signature)):
+            # Keep the older representative when a band is already taken
+            table.setdefault(band_key, key)
+        self.representatives[key] = (signature, value)
+        while len(self.representatives) > self.max_representatives:
+            self.evict()
+
+    def set_value(self, key, value):
+        if key in self.representatives:
+            self.representatives[key] = (self.representatives[key][0], value)
+
+    def evict(self):
+        key, (signature, _) = self.representatives.popitem(last=False)
+        for table, band_key in zip(self.tables, self.band_keys(signature)):
+            if table.get(band_key) == key:
+                del table[band_key]
+
+    def __len__(self):
+        return len(self.representatives)
+
+
+class DedupScorer:
+    """Scores one representative per near-duplicate cluster
+
+    Wraps an EmotionalAnalyzer or ScoringPool (anything with
+    analyze_batch). Texts are numbered in the order they arrive, starting
+    at position. A text close enough to an earlier representative is not
+    analyzed: it gets a copy of the representative's result plus
+    'duplicate_of': {'position', 'similarity'} pointing back to it.
+    stats() reports the dedup ratio and the inference time saved.
+    """
+
+    def __init__(self, scorer, threshold=0.8, num_perm=64, shingle_size=3, max_representatives=100000,
+                 position=0):
+        self.scorer = scorer
+        self.index = NearDuplicateIndex(threshold, num_perm, shingle_size, max_representatives)
+        self.position = position
+        self.texts = 0
+        self.duplicates = 0
+        self.scored = 0
+        self.inference_seconds = 0.0
+        self.signature_seconds = 0.0
+
+    def analyze_batch(self, texts, batch_size=32, workers=4):
+        """Drop-in for analyze_batch; duplicates come back with 'duplicate_of'"""
+        texts = list(texts)
+        # Per text: ('score', index into to_score, position) or ('copy', key, similarity)
+        plan = []
+        to_score = []
+        start = time.perf_counter()
+        for text in texts:
+            position = self.position
+            self.position += 1
+            signature = self.index.signature(text)
+            match = self.index.find(signature) if signature is not None else None
+            if match is None:
+                if signature is not None:
+                    self.index.add(position, signature)
+                plan.append(('score', len(to_score), position))
+                to_score.append(text)
+            else:
+                plan.append(('copy', match[0], match[2]))
+        self.signature_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scored = self.scorer.analyze_batch(to_score, batch_size=batch_size) if to_score else []
+        self.inference_seconds += time.perf_counter() - start
+        for (_, _, position), result in zip((step for step in plan if step[0] == 'score'), scored):
+            self.index.set_value(position, result)
+
+        results = []
+        for text, step in zip(texts, plan):
+            if step[0] == 'score':
+                results.append(scored[step[1]])
+                continue
+            _, key, similarity = step
+            representative = self.index.representatives.get(key)
+            if representative is None or representative[1] is None:
+                # Evicted before this batch finished; score the text after all
+                start = time.perf_counter()
+                results.append(self.scorer.analyze_batch([text], batch_size=1)[0])
+                self.inference_seconds += time.perf_counter() - start
+                self.scored += 1
+                continue
+            result = copy.deepcopy(representative[1])
+            result['duplicate_of'] = {'position': key, 'similarity': similarity}
+            results.append(result)
+            self.duplicates += 1
+
+        self.texts += len(texts)
+        self.scored += len(to_score)
+        return results
+
+    def stats(self):
+        """Dedup ratio, inference time and the estimated time saved
+
+        estimated_seconds_saved is the duplicates times the measured
+        inference seconds per scored text, minus the time spent on
+        signatures and lookups.
+        """
+        per_text = self.inference_seconds / self.scored if self.scored else 0.0
+        saved = self.duplicates * per_text
+        return {
+            'texts': self.texts,
+            'scored': self.scored,
+            'duplicates': self.duplicates,
+            'dedup_ratio': self.duplicates / self.texts if self.texts else 0.0,
+            'representatives': len(self.index),
+            'inference_seconds': self.inference_seconds,
+            'signature_seconds': self.signature_seconds,
+            'estimated_seconds_saved': saved - self.signature_seconds
+        }
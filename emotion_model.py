@@ -1,48 +1,455 @@
 import re
+import copy
+import json
+import hashlib
+import sqlite3
+import threading
+import time
 import numpy as np
+from collections import OrderedDict
 from textblob import TextBlob
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from metrics import Instrumentation
+from topics import TopicExtractor, TokenizedText
+from entities import EntityExtractor
+from scoring import EmotionScores
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+# Bump whenever the analysis logic changes so stale cached results are ignored
+ANALYSIS_VERSION = 2
+
+# Run through the models once after loading, so the first real request
+# does not pay for lazy allocations and kernel selection
+WARMUP_TEXTS = [
+    "I'm so excited about my vacation next week!",
+    "I'm really frustrated with my team at work. They never listen to my ideas.",
+    "The news makes me worried about the future."
+]
+
+# Share of each emotion's probability that counts as positive sentiment.
+# Used in combined mode to derive sentiment from the emotion model alone.
+EMOTION_POLARITY = {
+    'joy': 1.0,
+    'surprise': 0.6,
+    'neutral': 0.5,
+    'anger': 0.0,
+    'disgust': 0.0,
+    'fear': 0.0,
+    'sadness': 0.0
+}
+
+# Logistic calibration applied to the derived positive probability so the
+# scores line up with the standalone sentiment model
+SENTIMENT_CALIBRATION = {'slope': 1.5, 'bias': 0.0}
+
+EMOTION_SUGGESTIONS = {
+    'anger': [
+        "Try deep breathing exercises to calm down",
+        "Consider taking a short walk to clear your mind",
+        "Write down your thoughts in a journal",
+        "Practice mindfulness meditation"
+    ],
+    'fear': [
+        "Break down the situation into smaller, manageable parts",
+        "Talk to someone you trust about your concerns",
+        "Focus on what you can control",
+        "Practice grounding techniques"
+    ],
+    'joy': [
+        "Share your happiness with others",
+        "Take a moment to appreciate this feeling",
+        "Consider doing something creative",
+        "Spread positivity to others"
+    ],
+    'sadness': [
+        "Reach out to friends or family for support",
+        "Engage in activities you usually enjoy",
+        "Practice self-compassion",
+        "Consider light physical activity"
+    ],
+    'surprise': [
+        "Take a moment to process the information",
+        "Consider the implications before reacting",
+        "Talk to others about the surprising event",
+        "Keep an open mind about outcomes"
+    ],
+    'disgust': [
+        "Identify the source of discomfort",
+        "Consider if this aligns with your values",
+        "Remove yourself from the situation if possible",
+        "Reflect on why this triggers such a strong reaction"
+    ],
+    'neutral': [
+        "Maintain your balanced perspective",
+        "Consider exploring new interests",
+        "Practice mindfulness to stay present",
+        "Set some personal goals"
+    ]
+}
+
+
+def intensity_bands(intensity):
+    """Suggestion band per intensity: 0 below 0.3, 1 up to 0.6, 2 up to 0.8, 3 above"""
+    intensity = np.asarray(intensity)
+    return (intensity >= 0.3).astype(np.int8) + (intensity > 0.6) + (intensity > 0.8)
+
+
+def build_suggestion_table():
+    """Every possible suggestion list keyed by (emotion, intensity band, sentiment)"""
+    table = {}
+    for emotion, emotion_suggestions in EMOTION_SUGGESTIONS.items():
+        for band in range(4):
+            for sentiment in ('POSITIVE', 'NEGATIVE', None):
+                suggestions = []
+                # Intensity-based adjustments
+                if band == 3:
+                    suggestions.append("Your emotions are quite intense. Consider taking a break before making decisions.")
+                elif band == 0:
+                    suggestions.append("Your emotions seem mild. This might be a good time for reflection.")
+
+                suggestions.extend(emotion_suggestions[:2])
+
+                # Sentiment-based suggestions
+                if sentiment == 'NEGATIVE' and band >= 2:
+                    suggestions.append("Consider speaking with a mental health professional for additional support")
+                elif sentiment == 'POSITIVE':
+                    suggestions.append("Use this positive energy to work on personal projects or help others")
+
+                table[(emotion, band, sentiment)] = tuple(suggestions)
+    return table
+
+
+SUGGESTION_TABLE = build_suggestion_table()
+
+# Built-in fallback lexicon; every term has weight 1
+DEFAULT_EMOTION_KEYWORDS = {
+    'anger': ['angry', 'mad', 'furious', 'annoyed', 'frustrated'],
+    'fear': ['scared', 'afraid', 'worried', 'anxious', 'nervous'],
+    'joy': ['happy', 'excited', 'joy', 'delighted', 'pleased'],
+    'sadness': ['sad', 'unhappy', 'depressed', 'miserable', 'lonely'],
+    'surprise': ['surprised', 'shocked', 'amazed', 'astonished'],
+    'disgust': ['disgusted', 'gross', 'revolted', 'sickened']
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Words plus the punctuation that ends a negation's scope
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[.,;:!?]")
+CLAUSE_BREAKS = frozenset('.,;:!?')
+NEGATORS = frozenset(['not', 'no', 'never', 'nor', 'without', 'hardly', 'barely', 'neither'])
+
+# A sentence runs up to and including its closing punctuation (or end of text)
+SENTENCE_PATTERN = re.compile(r'[^.!?\n]+(?:[.!?]+|\n|$)')
+
+
+class ResultCache:
+    """LRU cache of full analysis results with an optional SQLite tier
+
+    Keys are a hash of the normalized text plus the analyzer's model
+    identity, so results from different models or versions never mix.
+    """
+
+    def __init__(self, max_entries=10000, db_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = None
+
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self.db.commit()
+
+    @staticmethod
+    def make_key(text, model_identity):
+        """Hash whitespace-normalized text together with the model identity"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model_identity}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached result, or None on a miss"""
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(result)
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.disk_hits += 1
+                    return copy.deepcopy(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """Store a result in memory and, if enabled, on disk"""
+        with self.lock:
+            self._remember(key, copy.deepcopy(result))
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                    (key, json.dumps(result))
+                )
+                self.db.commit()
+
+    def _remember(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'size': len(self.entries),
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop every cached result, including the disk tier"""
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class KeywordMatcher:
+    """Whole-word emotion lexicon matcher compiled once up front
+
+    Text is tokenized in a single regex pass and each token (or phrase of up
+    to max_phrase_len tokens) is looked up in a hash table, so the per-call
+    cost depends on the text length, not the lexicon size. A term preceded
+    by a negator within negation_window tokens is scaled by negation_scale.
+    """
+
+    def __init__(self, lexicon=None, negation_window=3, negation_scale=0.0):
+        lexicon = lexicon if lexicon is not None else DEFAULT_EMOTION_KEYWORDS
+        self.negation_window = negation_window
+        self.negation_scale = negation_scale
+        self.emotions = list(lexicon)
+        self.term_counts = {emotion: len(terms) for emotion, terms in lexicon.items()}
+        self.terms = {}
+        self.max_phrase_len = 1
+
+        for emotion, terms in lexicon.items():
+            # Terms are either a list (weight 1) or a {term: weight} dict
+            weighted = terms.items() if isinstance(terms, dict) else ((term, 1.0) for term in terms)
+            for term, weight in weighted:
+                key = " ".join(WORD_PATTERN.findall(term.lower()))
+                if not key:
+                    continue
+                self.terms.setdefault(key, []).append((emotion, float(weight)))
+                self.max_phrase_len = max(self.max_phrase_len, key.count(" ") + 1)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load a lexicon of 'term,emotion[,weight]' lines ('#' starts a comment)"""
+        lexicon = {}
+        with open(path, encoding='utf-8') as lexicon_file:
+            for line in lexicon_file:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                fields = [field.strip() for field in line.split(',')]
+                weight = float(fields[2]) if len(fields) > 2 and fields[2] else 1.0
+                lexicon.setdefault(fields[1], {})[fields[0]] = weight
+        return cls(lexicon, **kwargs)
+
+    def score(self, text, tokens=None):
+        """Score every emotion in one pass over the text
+
+        Each distinct term counts once, and an emotion's score is its summed
+        term weights over the number of terms it has in the lexicon.
+        """
+        if tokens is None:
+            tokens = TOKEN_PATTERN.findall(text.lower())
+        matched = {}
+        last_negator = -self.negation_window - 1
+
+        for i, token in enumerate(tokens):
+            if token in CLAUSE_BREAKS:
+                last_negator = -self.negation_window - 1
+                continue
+            if token in NEGATORS or token.endswith("n't"):
+                last_negator = i
+                continue
+
+            for length in range(1, min(self.max_phrase_len, len(tokens) - i) + 1):
+                key = token if length == 1 else " ".join(tokens[i:i + length])
+                if key not in self.terms or key in matched:
+                    continue
+                negated = i - last_negator <= self.negation_window
+                matched[key] = self.negation_scale if negated else 1.0
+
+        scores = dict.fromkeys(self.emotions, 0.0)
+        for key, scale in matched.items():
+            for emotion, weight in self.terms[key]:
+                scores[emotion] += weight * scale
+
+        return {
+            emotion: max(score, 0.0) / self.term_counts[emotion] if self.term_counts[emotion] else 0
+            for emotion, score in scores.items()
+        }
+
 
 class EmotionalAnalyzer:
-    def __init__(self):
+    def __init__(self, combined=False, cache=None, background=False,
+                 backend='pytorch', emotion_model=EMOTION_MODEL, lexicon=None,
+                 sentiment_model=None, metrics=None, topic_engine='textblob', topic_extractor=None,
+                 entity_extractor=None, embeddings=False, cascade=False, cascade_threshold=0.7,
+                 cascade_margin=0.3, bundle=None, warmup_texts=None):
         self.emotion_classifier = None
         self.sentiment_analyzer = None
         self.models_loaded = False
-        self.load_models()
+        # Combined mode derives sentiment from the emotion model's output
+        # instead of running a second transformer
+        self.combined = combined
+        # Optional ResultCache for repeated texts
+        self.cache = cache
+        # Emotion model inference backend: 'pytorch', 'quantized', 'onnx' or
+        # 'student' (a distilled n-gram model; emotion_model is its directory)
+        self.backend = backend
+        self.emotion_model = emotion_model
+        # None uses the transformers default sentiment-analysis model
+        self.sentiment_model = sentiment_model
+        self.onnx_dir = None
+        # A model_bundle.py directory replaces both model names with its
+        # local snapshots, so loading needs no network
+        self.bundle = bundle
+        if bundle is not None:
+            from model_bundle import bundle_paths
+            paths = bundle_paths(bundle)
+            self.emotion_model = paths['emotion']
+            self.sentiment_model = paths['sentiment']
+            self.onnx_dir = paths['onnx_dir']
+        # Texts run through the models before they are reported ready; None
+        # uses WARMUP_TEXTS and an empty list skips the warm-up
+        self.warmup_texts = WARMUP_TEXTS if warmup_texts is None else list(warmup_texts)
+        self.load_seconds = None
+        self.warmup_seconds = 0.0
+        # Fallback keyword matcher; lexicon is a {emotion: terms} dict or a file path
+        if isinstance(lexicon, str):
+            self.keyword_matcher = KeywordMatcher.from_file(lexicon)
+        else:
+            self.keyword_matcher = KeywordMatcher(lexicon)
+        # 'textblob' uses TextBlob noun phrases for topics; 'fast' uses a
+        # TopicExtractor over one tokenization shared with keywords and entities
+        if topic_engine not in ('textblob', 'fast'):
+            raise ValueError(f"Unknown topic engine: {topic_engine} (expected 'textblob' or 'fast')")
+        self.topic_engine = topic_engine
+        self.topic_extractor = (topic_extractor or TopicExtractor()) if topic_engine == 'fast' else None
+        # Names and places; pass EntityExtractor.from_file(path) to add a gazetteer
+        self.entity_extractor = entity_extractor or EntityExtractor()
+        # Also return the emotion model's pooled encoder output as
+        # result['embedding'], for similarity search with a VectorIndex
+        self.embeddings = embeddings
+        # Cascade mode scores every text with the keyword/TextBlob path first
+        # and only runs the models when that score's confidence (top
+        # normalized emotion score) or margin (top minus runner-up) falls
+        # below the thresholds
+        self.cascade = cascade
+        self.cascade_threshold = cascade_threshold
+        self.cascade_margin = cascade_margin
+        self.cascade_lock = threading.Lock()
+        self.cascade_counts = {'fast': 0, 'model': 0}
+        self.cascade_seconds = {'fast': 0.0, 'model': 0.0}
+        # Per-sentence results for analyze_incremental, keyed by content hash (LRU)
+        self.sentence_memo = OrderedDict()
+        self.sentence_memo_size = 4096
+        self.sentence_lock = threading.Lock()
+        # Stage timings and counters; pass Instrumentation(enabled=False) to turn off
+        self.metrics = metrics if metrics is not None else Instrumentation()
+        # One of 'loading', 'ready' or 'failed'; the UI can poll this
+        self.load_state = 'loading'
+        self.ready_event = threading.Event()
+        self.load_thread = None
+
+        if background:
+            # Serve fallback results right away and swap to the models once loaded
+            self.setup_fallback_analyzer()
+            self.load_thread = threading.Thread(target=self.load_models, name="model-loader", daemon=True)
+            self.load_thread.start()
+        else:
+            self.load_models()
+
+    def is_ready(self):
+        """True once model loading has finished, successfully or not"""
+        return self.ready_event.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until background loading finishes; returns is_ready()"""
+        return self.ready_event.wait(timeout)
 
     def load_models(self):
         """Load models with error handling and fallbacks"""
+        start = time.perf_counter()
         try:
-            from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-            import torch
-
-            logger.info("Loading emotion classification model...")
-            self.emotion_classifier = pipeline(
-                "text-classification",
-                model="j-hartmann/emotion-english-distilroberta-base",
-                return_all_scores=True,
-                device=-1  # Use CPU
-            )
+            from inference_backends import build_emotion_classifier, build_sentiment_classifier
 
-            logger.info("Loading sentiment analysis model...")
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                device=-1  # Use CPU
-            )
+            logger.info(f"Loading emotion classification model ({self.backend} backend)...")
+            self.emotion_classifier = build_emotion_classifier(self.backend, self.emotion_model, self.onnx_dir)
+
+            if self.combined:
+                logger.info("Combined mode: deriving sentiment from emotion scores")
+            else:
+                logger.info("Loading sentiment analysis model...")
+                self.sentiment_analyzer = build_sentiment_classifier(self.sentiment_model)
+
+            if self.warmup_texts:
+                warmup_start = time.perf_counter()
+                self.warm_up(self.warmup_texts)
+                self.warmup_seconds = time.perf_counter() - warmup_start
+                self.metrics.gauge('warmup_seconds', self.warmup_seconds)
 
+            # Flip this last so concurrent callers only see fully loaded models
             self.models_loaded = True
-            logger.info("All models loaded successfully!")
+            self.load_state = 'ready'
+            logger.info(f"All models loaded successfully in {time.perf_counter() - start:.2f}s "
+                        f"(warm-up {self.warmup_seconds:.2f}s)")
 
         except Exception as e:
             logger.error(f"Error loading models: {e}")
             self.models_loaded = False
+            self.load_state = 'failed'
             self.setup_fallback_analyzer()
 
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self.metrics.gauge('model_load_seconds', self.load_seconds)
+            self.ready_event.set()
+
+    def warm_up(self, texts):
+        """Run the loaded classifiers once over texts, without caching anything"""
+        self.emotion_classifier.probabilities(texts, len(texts))
+        if self.sentiment_analyzer is not None:
+            self.sentiment_analyzer(texts, batch_size=len(texts))
+
     def setup_fallback_analyzer(self):
         """Setup fallback analysis using TextBlob and rule-based methods"""
         logger.info("Setting up fallback analyzer...")
@@ -52,8 +459,13 @@ class EmotionalAnalyzer:
             'neutral': ['neutral']
         }
 
-    def extract_context(self, text):
-        """Extract context from text"""
+    def extract_context(self, text, sentiment_result=None, tokenized=None, blob=None):
+        """Extract context from text, optionally reusing a precomputed sentiment result
+
+        tokenized is a TokenizedText shared with the rest of the request when
+        the fast topic engine is in use; blob is the request's TextBlob, whose
+        polarity and noun phrases are computed once and shared.
+        """
         context = {
             'topics': [],
             'sentiment': '',
@@ -62,32 +474,39 @@ class EmotionalAnalyzer:
         }
 
         try:
-            # Analyze with TextBlob for additional insights
-            blob = TextBlob(text)
+            # TextBlob is only built when a stage below needs it
+            if self.topic_extractor is not None and tokenized is None:
+                with self.metrics.timer('tokenize'):
+                    tokenized = TokenizedText(text)
 
             # Sentiment analysis with fallback
             if self.models_loaded:
-                sentiment_result = self.sentiment_analyzer(text[:512])[0]
+                if sentiment_result is None:
+                    with self.metrics.timer('sentiment_model'):
+                        sentiment_result = self.classify_sentiment(text)
                 context['sentiment'] = sentiment_result['label']
                 context['intensity'] = sentiment_result['score']
             else:
                 # Fallback sentiment analysis using TextBlob
-                polarity = blob.sentiment.polarity
-                if polarity > 0.1:
-                    context['sentiment'] = 'POSITIVE'
-                    context['intensity'] = abs(polarity)
-                elif polarity < -0.1:
-                    context['sentiment'] = 'NEGATIVE'
-                    context['intensity'] = abs(polarity)
-                else:
-                    context['sentiment'] = 'NEUTRAL'
-                    context['intensity'] = 0.5
+                with self.metrics.timer('textblob_sentiment'):
+                    blob = blob or TextBlob(text)
+                    polarity = blob.sentiment.polarity
+                sentiment_result = self.polarity_sentiment(polarity)
+                context['sentiment'] = sentiment_result['label']
+                context['intensity'] = sentiment_result['score']
 
             # Extract potential topics (simple noun phrase extraction)
-            context['topics'] = [str(noun) for noun in blob.noun_phrases[:5]]
+            if self.topic_extractor is not None:
+                with self.metrics.timer('topics'):
+                    context['topics'] = self.topic_extractor.extract(tokenized)
+            else:
+                with self.metrics.timer('noun_phrases'):
+                    blob = blob or TextBlob(text)
+                    context['topics'] = [str(noun) for noun in blob.noun_phrases[:5]]
 
             # Simple entity extraction (names, places, etc.)
-            context['key_entities'] = self.extract_entities(text)
+            with self.metrics.timer('entities'):
+                context['key_entities'] = self.extract_entities(text, tokenized)
 
         except Exception as e:
             logger.error(f"Error in context extraction: {e}")
@@ -99,57 +518,73 @@ class EmotionalAnalyzer:
 
         return context
 
-    def extract_entities(self, text):
-        """Simple entity extraction using patterns"""
-        entities = []
+    def classify_sentiment(self, text):
+        """Get a sentiment label/score for text from the loaded models"""
+        if self.combined:
+            return self.sentiments_from_scores(self.score_with_model([text]))[0]
+        return self.sentiment_analyzer(text)[0]
+
+    def sentiment_from_emotions(self, all_emotions):
+        """Map emotion probabilities onto a calibrated POSITIVE/NEGATIVE result"""
+        labels = list(all_emotions)
+        scores = EmotionScores(labels, [all_emotions[label] for label in labels])
+        return self.sentiments_from_scores(scores)[0]
+
+    def sentiments_from_scores(self, scores):
+        """sentiment_from_emotions for every row of an EmotionScores at once"""
+        polarity = np.array([EMOTION_POLARITY.get(label, 0.5) for label in scores.labels])
+        matrix = scores.matrix.astype(np.float64)
+        totals = matrix.sum(axis=1)
+        totals[totals == 0] = 1.0
+        positive = np.clip(matrix @ polarity / totals, 1e-6, 1 - 1e-6)
+
+        logit = np.log(positive / (1 - positive))
+        calibrated = 1 / (1 + np.exp(-(SENTIMENT_CALIBRATION['slope'] * logit + SENTIMENT_CALIBRATION['bias'])))
 
+        return [
+            {'label': 'POSITIVE', 'score': value} if value >= 0.5 else {'label': 'NEGATIVE', 'score': 1 - value}
+            for value in calibrated.tolist()
+        ]
+
+    def extract_entities(self, text, tokenized=None):
+        """Ranked entity extraction (names, places, gazetteer matches)"""
         try:
-            # Extract potential names (capitalized words)
-            name_pattern = r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b'
-            names = re.findall(name_pattern, text)
-            entities.extend(names)
-
-            # Extract potential places (contextual)
-            place_indicators = ['at', 'in', 'from', 'to', 'going to']
-            words = text.lower().split()
-            for i, word in enumerate(words):
-                if word in place_indicators and i + 1 < len(words):
-                    entities.append(words[i + 1].title())
+            return self.entity_extractor.extract(tokenized if tokenized is not None else text)
 
         except Exception as e:
             logger.error(f"Error in entity extraction: {e}")
+            return []
 
-        return list(set(entities))[:3]
+    @staticmethod
+    def polarity_sentiment(polarity):
+        """Map a TextBlob polarity onto a sentiment label/score result"""
+        if polarity > 0.1:
+            return {'label': 'POSITIVE', 'score': abs(polarity)}
+        if polarity < -0.1:
+            return {'label': 'NEGATIVE', 'score': abs(polarity)}
+        return {'label': 'NEUTRAL', 'score': 0.5}
 
-    def analyze_emotion_fallback(self, text):
+    def analyze_emotion_fallback(self, text, tokenized=None, blob=None):
         """Fallback emotion analysis using TextBlob and keywords"""
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-        subjectivity = blob.sentiment.subjectivity
+        self.metrics.count('fallback')
+        return self.fast_analysis(text, tokenized, blob)[0]
 
-        # Keyword-based emotion detection
-        emotion_keywords = {
-            'anger': ['angry', 'mad', 'furious', 'annoyed', 'frustrated'],
-            'fear': ['scared', 'afraid', 'worried', 'anxious', 'nervous'],
-            'joy': ['happy', 'excited', 'joy', 'delighted', 'pleased'],
-            'sadness': ['sad', 'unhappy', 'depressed', 'miserable', 'lonely'],
-            'surprise': ['surprised', 'shocked', 'amazed', 'astonished'],
-            'disgust': ['disgusted', 'gross', 'revolted', 'sickened']
-        }
+    def fast_analysis(self, text, tokenized=None, blob=None):
+        """Keyword and TextBlob scoring: (emotion data, TextBlob polarity)"""
+        blob = blob or TextBlob(text)
+        with self.metrics.timer('textblob_sentiment'):
+            polarity = blob.sentiment.polarity
+            subjectivity = blob.sentiment.subjectivity
 
-        text_lower = text.lower()
-        emotion_scores = {}
-
-        # Score emotions based on keywords
-        for emotion, keywords in emotion_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            emotion_scores[emotion] = score / len(keywords) if keywords else 0
+        # Keyword-based emotion detection
+        with self.metrics.timer('keywords'):
+            emotion_scores = self.keyword_matcher.score(text, tokenized.lower if tokenized is not None else None)
 
         # Adjust based on sentiment
         if polarity > 0.3:
-            emotion_scores['joy'] += 0.3
+            emotion_scores['joy'] = emotion_scores.get('joy', 0) + 0.3
         elif polarity < -0.3:
-            emotion_scores['sadness'] += 0.3
+            emotion_scores['sadness'] = emotion_scores.get('sadness', 0) + 0.3
 
         # Determine primary emotion
         if any(emotion_scores.values()):
@@ -167,102 +602,770 @@ class EmotionalAnalyzer:
             'primary_score': primary_emotion[1],
             'all_emotions': normalized_scores,
             'emotional_intensity': max(normalized_scores.values()) if normalized_scores else 0.5
+        }, polarity
+
+    @staticmethod
+    def fast_confidence(emotion_data):
+        """(confidence, margin) of a fast-path result: the top normalized score and its lead"""
+        scores = sorted(emotion_data['all_emotions'].values(), reverse=True)
+        if not scores:
+            return 0.0, 0.0
+        return scores[0], scores[0] - (scores[1] if len(scores) > 1 else 0.0)
+
+    def is_confident(self, emotion_data, threshold=None, margin=None):
+        """Whether a fast-path result can be kept without running the models"""
+        threshold = self.cascade_threshold if threshold is None else threshold
+        margin = self.cascade_margin if margin is None else margin
+        confidence, lead = self.fast_confidence(emotion_data)
+        # A text with no keyword hits is scored 'neutral' by default; never trust that
+        return emotion_data['primary_emotion'] != 'neutral' and confidence >= threshold and lead >= margin
+
+    def route_cascade(self, texts):
+        """Score texts on the fast path and split them by tier
+
+        Returns (fast, escalated): fast maps a text's position to its kept
+        (emotion data, sentiment result); escalated lists the positions that
+        need the models.
+        """
+        fast = {}
+        escalated = []
+        start = time.perf_counter()
+        with self.metrics.timer('cascade_fast'):
+            for i, text in enumerate(texts):
+                emotion_data, polarity = self.fast_analysis(text)
+                if self.is_confident(emotion_data):
+                    fast[i] = (emotion_data, self.polarity_sentiment(polarity))
+                else:
+                    escalated.append(i)
+
+        self.metrics.count('cascade_fast', len(fast))
+        self.metrics.count('cascade_model', len(escalated))
+        with self.cascade_lock:
+            self.cascade_counts['fast'] += len(fast)
+            self.cascade_counts['model'] += len(escalated)
+            self.cascade_seconds['fast'] += time.perf_counter() - start
+        return fast, escalated
+
+    def record_model_tier(self, seconds):
+        with self.cascade_lock:
+            self.cascade_seconds['model'] += seconds
+
+    def cascade_stats(self):
+        """Texts kept on each tier, the escalation rate and time spent per tier
+
+        Every text pays for the fast tier; only escalated texts pay for the
+        model tier, so seconds_per_text is the average cost of a request.
+        """
+        with self.cascade_lock:
+            counts = dict(self.cascade_counts)
+            seconds = dict(self.cascade_seconds)
+        total = counts['fast'] + counts['model']
+        return {
+            'texts': total,
+            'fast': counts['fast'],
+            'model': counts['model'],
+            'escalation_rate': counts['model'] / total if total else 0.0,
+            'fast_seconds': seconds['fast'],
+            'model_seconds': seconds['model'],
+            'seconds_per_text': (seconds['fast'] + seconds['model']) / total if total else 0.0
         }
 
-    def analyze_emotion(self, text):
-        """Analyze emotions from text with fallback"""
+    def cascade_report(self, texts, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9), margins=(0.0, 0.2, 0.3, 0.5),
+                       batch_size=32):
+        """Accuracy and cost of the cascade for each threshold/margin pair
+
+        Every text is labelled by the models (the reference) and by the fast
+        path, and both are timed. Each setting reports the share of texts
+        escalated, how often the cascade's primary emotion and sentiment
+        match the models' labels, and the estimated scoring seconds per
+        text. An escalated text's model cost is its share of the measured
+        model time by token count.
+        """
         if not self.models_loaded:
-            return self.analyze_emotion_fallback(text)
+            raise RuntimeError("The cascade report needs the models loaded")
+        texts = list(texts)
+        if not texts:
+            raise ValueError("The cascade report needs at least one text")
 
-        try:
-            emotion_results = self.emotion_classifier(text[:512])[0]
+        start = time.perf_counter()
+        fast = [self.fast_analysis(text) for text in texts]
+        fast_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lengths = self.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        model_emotions = [None] * len(texts)
+        model_sentiments = [None] * len(texts)
+        for offset in range(0, len(order), batch_size):
+            indices = order[offset:offset + batch_size]
+            batch = [texts[i] for i in indices]
+            scores = self.score_with_model(batch, len(batch))
+            if self.combined:
+                sentiments = self.sentiments_from_scores(scores)
+            else:
+                sentiments = self.sentiment_analyzer(batch, batch_size=len(batch))
+            for i, emotion, sentiment in zip(indices, scores.primary_labels, sentiments):
+                model_emotions[i] = emotion
+                model_sentiments[i] = sentiment['label']
+        model_seconds = time.perf_counter() - start
 
-            # Sort emotions by score
-            sorted_emotions = sorted(emotion_results, key=lambda x: x['score'], reverse=True)
+        confidence, lead = np.array([self.fast_confidence(emotion_data) for emotion_data, _ in fast]).T
+        scored = np.array([emotion_data['primary_emotion'] != 'neutral' for emotion_data, _ in fast])
+        emotion_match = np.array([emotion_data['primary_emotion'] == label
+                                  for (emotion_data, _), label in zip(fast, model_emotions)])
+        sentiment_match = np.array([self.polarity_sentiment(polarity)['label'] == label
+                                    for (_, polarity), label in zip(fast, model_sentiments)])
+        model_cost = model_seconds * np.asarray(lengths, dtype=np.float64) / max(sum(lengths), 1)
 
-            emotions = {
-                'primary_emotion': sorted_emotions[0]['label'],
-                'primary_score': sorted_emotions[0]['score'],
-                'all_emotions': {emotion['label']: emotion['score'] for emotion in sorted_emotions},
-                'emotional_intensity': max([emotion['score'] for emotion in sorted_emotions])
-            }
+        settings = []
+        for threshold in thresholds:
+            for margin in margins:
+                keep = scored & (confidence >= threshold) & (lead >= margin)
+                seconds = (fast_seconds + model_cost[~keep].sum()) / len(texts)
+                settings.append({
+                    'threshold': threshold,
+                    'margin': margin,
+                    'escalation_rate': float(1 - keep.mean()),
+                    'emotion_accuracy': float(np.where(keep, emotion_match, True).mean()),
+                    'sentiment_agreement': float(np.where(keep, sentiment_match, True).mean()),
+                    'seconds_per_text': float(seconds),
+                    'cost_ratio': float(seconds * len(texts) / model_seconds) if model_seconds else 0.0
+                })
+
+        return {
+            'texts': len(texts),
+            'fast_seconds_per_text': fast_seconds / len(texts),
+            'model_seconds_per_text': model_seconds / len(texts),
+            'fast_only': {
+                'emotion_accuracy': float(emotion_match.mean()),
+                'sentiment_agreement': float(sentiment_match.mean())
+            },
+            'settings': settings
+        }
 
-            return emotions
+    def analyze_emotion(self, text, tokenized=None, blob=None):
+        """Analyze emotions from text with fallback"""
+        if not self.models_loaded:
+            return self.analyze_emotion_fallback(text, tokenized, blob)
+
+        try:
+            with self.metrics.timer('emotion_model'):
+                scores = self.score_with_model([text])
+            return scores.emotion_data(0)
 
         except Exception as e:
             logger.error(f"Error in emotion analysis: {e}")
-            return self.analyze_emotion_fallback(text)
+            return self.analyze_emotion_fallback(text, tokenized, blob)
 
-    def get_suggestions(self, emotion_data, context):
-        """Provide suggestions based on emotion and context"""
-        primary_emotion = emotion_data['primary_emotion']
-        intensity = emotion_data['emotional_intensity']
-        sentiment = context['sentiment']
-
-        suggestions = []
-
-        # Emotion-based suggestions
-        emotion_suggestions = {
-            'anger': [
-                "Try deep breathing exercises to calm down",
-                "Consider taking a short walk to clear your mind",
-                "Write down your thoughts in a journal",
-                "Practice mindfulness meditation"
-            ],
-            'fear': [
-                "Break down the situation into smaller, manageable parts",
-                "Talk to someone you trust about your concerns",
-                "Focus on what you can control",
-                "Practice grounding techniques"
-            ],
-            'joy': [
-                "Share your happiness with others",
-                "Take a moment to appreciate this feeling",
-                "Consider doing something creative",
-                "Spread positivity to others"
-            ],
-            'sadness': [
-                "Reach out to friends or family for support",
-                "Engage in activities you usually enjoy",
-                "Practice self-compassion",
-                "Consider light physical activity"
-            ],
-            'surprise': [
-                "Take a moment to process the information",
-                "Consider the implications before reacting",
-                "Talk to others about the surprising event",
-                "Keep an open mind about outcomes"
-            ],
-            'disgust': [
-                "Identify the source of discomfort",
-                "Consider if this aligns with your values",
-                "Remove yourself from the situation if possible",
-                "Reflect on why this triggers such a strong reaction"
-            ],
-            'neutral': [
-                "Maintain your balanced perspective",
-                "Consider exploring new interests",
-                "Practice mindfulness to stay present",
-                "Set some personal goals"
-            ]
+    def build_emotion_data(self, emotion_results):
+        """Convert raw pipeline-style classifier scores into the emotion data dict"""
+        return EmotionScores.from_results([emotion_results]).emotion_data(0)
+
+    def score_with_model(self, texts, batch_size=None, pooled=False):
+        """EmotionScores straight from the emotion model; no dicts are built
+
+        With pooled, returns (scores, embeddings) from the same pass.
+        """
+        probs, embeddings = self.emotion_classifier.probabilities(texts, batch_size, pooled=pooled)
+        scores = EmotionScores(self.emotion_classifier.labels, probs)
+        return (scores, embeddings) if pooled else scores
+
+    def score_emotions(self, texts, batch_size=32):
+        """Emotion scores for many texts as one EmotionScores matrix
+
+        The cheap path for batch jobs that only need the numbers: no context,
+        suggestions or per-text dicts. Uses the fallback analysis (one row
+        per text) when the models are not loaded.
+        """
+        texts = list(texts)
+        if self.models_loaded:
+            try:
+                with self.metrics.timer('emotion_model'):
+                    return self.score_with_model(texts, batch_size)
+            except Exception as e:
+                logger.error(f"Error in batch emotion scoring: {e}")
+
+        fallback = [self.analyze_emotion_fallback(text)['all_emotions'] for text in texts]
+        labels = list(self.keyword_matcher.emotions) + ['neutral']
+        return EmotionScores(labels, [[emotions.get(label, 0.0) for label in labels] for emotions in fallback])
+
+    def model_identity(self):
+        """Describe the models behind the current results, for cache keys"""
+        if not self.models_loaded:
+            models = "fallback"
+        elif self.combined:
+            models = f"{self.emotion_model}[{self.backend}]+derived-sentiment"
+        else:
+            models = f"{self.emotion_model}[{self.backend}]+{self.sentiment_model or 'default-sentiment'}"
+        if self.embeddings:
+            models += "+embeddings"
+        if self.cascade and self.models_loaded:
+            models += f"+cascade:{self.cascade_threshold}/{self.cascade_margin}"
+        return f"{models}+topics:{self.topic_engine}@v{ANALYSIS_VERSION}"
+
+    def analyze(self, text):
+        """Run the full emotion, context and suggestion analysis for one text
+
+        In combined mode this needs a single encoder pass: the sentiment is
+        derived from the same emotion scores. Results are served from the
+        cache when one is configured.
+        """
+        with self.metrics.request():
+            if self.cache is not None:
+                with self.metrics.timer('cache'):
+                    key = self.cache.make_key(text, self.model_identity())
+                    result = self.cache.get(key)
+                if result is not None:
+                    self.metrics.count('cache_hit')
+                    return result
+
+                self.metrics.count('cache_miss')
+                result = self.analyze_uncached(text)
+                self.cache.put(key, result)
+                return result
+
+            return self.analyze_uncached(text)
+
+    def analyze_uncached(self, text):
+        """Full analysis for one text, bypassing the cache"""
+        emotion_data = None
+        sentiment_result = None
+        embedding = None
+
+        if self.cascade and self.models_loaded:
+            fast, _ = self.route_cascade([text])
+            if fast:
+                emotion_data, sentiment_result = fast[0]
+                return self.finish_analysis(text, emotion_data, sentiment_result)
+
+        if self.models_loaded:
+            start = time.perf_counter()
+            if self.embeddings:
+                emotion_batch, embeddings = self.classify_emotions_batch([text], with_embeddings=True)
+                emotion_data = emotion_batch[0]
+                embedding = embeddings[0] if embeddings is not None else None
+            else:
+                emotion_data = self.analyze_emotion(text)
+            if self.combined and emotion_data is not None:
+                sentiment_result = self.sentiment_from_emotions(emotion_data['all_emotions'])
+            elif self.cascade and not self.combined:
+                # Run the sentiment model here so the model tier's time includes it
+                sentiment_result = self.classify_sentiment_batch([text])[0]
+            if self.cascade:
+                self.record_model_tier(time.perf_counter() - start)
+
+        return self.finish_analysis(text, emotion_data, sentiment_result, embedding)
+
+    def split_windows(self, text, window_chars=512):
+        """Split text into (start, end) windows on sentence boundaries
+
+        Sentences are packed into windows of at most window_chars characters;
+        a sentence longer than that is split at the last space that fits.
+        """
+        windows = []
+        window_start = window_end = None
+
+        for match in SENTENCE_PATTERN.finditer(text):
+            start, end = match.span()
+            if not text[start:end].strip():
+                continue
+
+            if window_start is not None and end - window_start <= window_chars:
+                window_end = end
+                continue
+
+            if window_start is not None:
+                windows.append((window_start, window_end))
+                window_start = None
+
+            # Break overlong sentences at whitespace
+            while end - start > window_chars:
+                cut = text.rfind(' ', start, start + window_chars)
+                if cut <= start:
+                    cut = start + window_chars
+                windows.append((start, cut))
+                start = cut
+                while start < end and text[start].isspace():
+                    start += 1
+
+            if start < end:
+                window_start, window_end = start, end
+
+        if window_start is not None:
+            windows.append((window_start, window_end))
+
+        return windows
+
+    def analyze_chunked(self, text, window_chars=512, aggregate='mean', batch_size=16):
+        """Analyze long text over sentence-aligned windows instead of truncating
+
+        Windows are run through the models batch_size at a time and their
+        scores are combined with a length-weighted 'mean' or an element-wise
+        'max'. Sentiment is always the length-weighted mean. Returns the usual
+        analysis dict plus a 'timeline' with per-window emotion scores.
+        Windows past the models' 512-token budget are truncated like any text.
+        """
+        if aggregate not in ('mean', 'max'):
+            raise ValueError(f"Unknown aggregate: {aggregate} (expected 'mean' or 'max')")
+
+        windows = self.split_windows(text, window_chars)
+        if not windows:
+            result = self.analyze(text)
+            result['timeline'] = []
+            return result
+
+        labels = None
+        rows = []
+        weights = []
+        combined_embedding = None
+        weight_total = 0.0
+        positive_total = 0.0
+        sentiment_seen = False
+        timeline = []
+
+        for start in range(0, len(windows), batch_size):
+            spans = windows[start:start + batch_size]
+            batch = [text[window_start:window_end] for window_start, window_end in spans]
+
+            if self.embeddings:
+                emotion_batch, embeddings = self.classify_emotions_batch(batch, with_embeddings=True)
+                if embeddings is not None:
+                    window_weights = np.array([window_end - window_start for window_start, window_end in spans])
+                    weighted = window_weights @ embeddings
+                    combined_embedding = weighted if combined_embedding is None else combined_embedding + weighted
+            else:
+                emotion_batch = self.classify_emotions_batch(batch)
+            if self.combined or not self.models_loaded:
+                sentiment_batch = [None] * len(batch)
+            else:
+                sentiment_batch = self.classify_sentiment_batch(batch)
+
+            for (window_start, window_end), window, emotion_data, sentiment_result in zip(
+                    spans, batch, emotion_batch, sentiment_batch):
+                if emotion_data is None:
+                    emotion_data = self.analyze_emotion_fallback(window)
+
+                if labels is None:
+                    labels = list(emotion_data['all_emotions'])
+                rows.append([emotion_data['all_emotions'].get(label, 0.0) for label in labels])
+                weight = window_end - window_start
+                weights.append(weight)
+                weight_total += weight
+
+                if sentiment_result is not None:
+                    positive = sentiment_result['score'] if sentiment_result['label'] == 'POSITIVE' \
+                        else 1 - sentiment_result['score']
+                    positive_total += weight * positive
+                    sentiment_seen = True
+
+                timeline.append({
+                    'start': window_start,
+                    'end': window_end,
+                    'primary_emotion': emotion_data['primary_emotion'],
+                    'primary_score': emotion_data['primary_score'],
+                    'all_emotions': emotion_data['all_emotions']
+                })
+
+        emotion_data = EmotionScores(labels, rows).combine(weights, aggregate).emotion_data(0)
+
+        sentiment_result = None
+        if self.models_loaded:
+            if self.combined:
+                sentiment_result = self.sentiment_from_emotions(emotion_data['all_emotions'])
+            elif sentiment_seen:
+                positive = positive_total / weight_total
+                sentiment_result = {'label': 'POSITIVE', 'score': positive} if positive >= 0.5 \
+                    else {'label': 'NEGATIVE', 'score': 1 - positive}
+
+        embedding = combined_embedding / weight_total if combined_embedding is not None else None
+        result = self.finish_analysis(text, emotion_data, sentiment_result, embedding)
+        result['timeline'] = timeline
+        return result
+
+    def split_sentences(self, text):
+        """(start, end) spans of the non-blank sentences in text, whitespace trimmed"""
+        spans = []
+        for match in SENTENCE_PATTERN.finditer(text):
+            start, end = match.span()
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                spans.append((start, end))
+        return spans
+
+    def analyze_incremental(self, text, aggregate='mean'):
+        """Analyze text from memoized per-sentence results
+
+        Each sentence's emotion scores, sentiment, topic candidates and
+        entities are memoized by a hash of its content and the models in use,
+        so after an edit only new or changed sentences are scored and the
+        cost follows the size of the edit, not of the entry. Sentences are
+        combined like analyze_chunked: a length-weighted 'mean' or an
+        element-wise 'max'. The result adds a per-sentence 'timeline' and
+        'incremental' counts of sentences reused and rescored.
+        """
+        if aggregate not in ('mean', 'max'):
+            raise ValueError(f"Unknown aggregate: {aggregate} (expected 'mean' or 'max')")
+
+        with self.metrics.request():
+            spans = self.split_sentences(text)
+            if not spans:
+                result = self.analyze_uncached(text)
+                result['timeline'] = []
+                result['incremental'] = {'sentences': 0, 'reused': 0, 'rescored': 0}
+                return result
+
+            sentences = [text[start:end] for start, end in spans]
+            with self.metrics.timer('sentence_memo'):
+                entries, rescored = self.sentence_entries(sentences)
+
+            with self.metrics.timer('aggregate'):
+                labels = list(entries[0]['all_emotions'])
+                weights = [end - start for start, end in spans]
+                rows = [[entry['all_emotions'].get(label, 0.0) for label in labels] for entry in entries]
+                emotion_data = EmotionScores(labels, rows).combine(weights, aggregate).emotion_data(0)
+                context = self.aggregate_context(entries, weights, emotion_data)
+
+            with self.metrics.timer('suggestions'):
+                suggestions = self.get_suggestions(emotion_data, context)
+
+        result = {
+            'emotion': emotion_data,
+            'context': context,
+            'suggestions': suggestions
         }
+        if self.embeddings:
+            embeddings = [entry['embedding'] for entry in entries]
+            result['embedding'] = None
+            if all(embedding is not None for embedding in embeddings):
+                combined = np.asarray(weights, dtype=np.float64) @ np.stack(embeddings) / sum(weights)
+                result['embedding'] = [float(value) for value in combined]
+        result['timeline'] = [
+            {
+                'start': start,
+                'end': end,
+                'primary_emotion': entry['primary_emotion'],
+                'primary_score': entry['primary_score'],
+                'all_emotions': entry['all_emotions']
+            }
+            for (start, end), entry in zip(spans, entries)
+        ]
+        result['incremental'] = {'sentences': len(sentences), 'reused': len(sentences) - rescored,
+                                 'rescored': rescored}
+        return result
 
-        # Intensity-based adjustments
-        if intensity > 0.8:
-            suggestions.append("Your emotions are quite intense. Consider taking a break before making decisions.")
-        elif intensity < 0.3:
-            suggestions.append("Your emotions seem mild. This might be a good time for reflection.")
+    def sentence_entries(self, sentences):
+        """Memo entries for sentences, scoring the missing ones in one batch
 
-        # Add emotion-specific suggestions
-        if primary_emotion in emotion_suggestions:
-            suggestions.extend(emotion_suggestions[primary_emotion][:2])
+        Returns (entries, number of sentences that had to be scored).
+        """
+        model_identity = self.model_identity()
+        keys = [ResultCache.make_key(sentence, model_identity) for sentence in sentences]
+        entries = [None] * len(sentences)
+        missing = {}
+        with self.sentence_lock:
+            for i, key in enumerate(keys):
+                entry = self.sentence_memo.get(key)
+                if entry is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self.sentence_memo.move_to_end(key)
+                    entries[i] = entry
+
+        if missing:
+            scored = self.score_sentences([sentences[positions[0]] for positions in missing.values()])
+            with self.sentence_lock:
+                for (key, positions), entry in zip(missing.items(), scored):
+                    for i in positions:
+                        entries[i] = entry
+                    self.sentence_memo[key] = entry
+                while len(self.sentence_memo) > self.sentence_memo_size:
+                    self.sentence_memo.popitem(last=False)
+
+        self.metrics.count('sentence_reused', len(sentences) - sum(len(positions) for positions in missing.values()))
+        self.metrics.count('sentence_scored', len(missing))
+        return entries, len(missing)
+
+    def score_sentences(self, sentences):
+        """Everything analyze_incremental needs from each sentence, for the memo"""
+        embeddings = None
+        sentiment_batch = [None] * len(sentences)
+        if self.models_loaded:
+            if self.embeddings:
+                emotion_batch, embeddings = self.classify_emotions_batch(sentences, with_embeddings=True)
+            else:
+                emotion_batch = self.classify_emotions_batch(sentences)
+            if not self.combined:
+                sentiment_batch = self.classify_sentiment_batch(sentences)
         else:
-            suggestions.extend(emotion_suggestions['neutral'][:2])
+            emotion_batch = [None] * len(sentences)
+
+        entries = []
+        for i, (sentence, emotion_data, sentiment_result) in enumerate(zip(sentences, emotion_batch, sentiment_batch)):
+            with self.metrics.timer('tokenize'):
+                tokenized = TokenizedText(sentence)
+            blob = TextBlob(sentence)
+
+            polarity = None
+            if emotion_data is None:
+                self.metrics.count('fallback')
+                emotion_data, polarity = self.fast_analysis(
+                    sentence, tokenized if self.topic_extractor is not None else None, blob)
 
-        # Sentiment-based suggestions
-        if sentiment == 'NEGATIVE' and intensity > 0.6:
-            suggestions.append("Consider speaking with a mental health professional for additional support")
-        elif sentiment == 'POSITIVE':
-            suggestions.append("Use this positive energy to work on personal projects or help others")
+            positive = None
+            if sentiment_result is not None:
+                positive = sentiment_result['score'] if sentiment_result['label'] == 'POSITIVE' \
+                    else 1 - sentiment_result['score']
+            elif polarity is None and not (self.models_loaded and self.combined):
+                try:
+                    with self.metrics.timer('textblob_sentiment'):
+                        polarity = blob.sentiment.polarity
+                except Exception as e:
+                    logger.error(f"Error in sentence sentiment: {e}")
+
+            # None marks a sentence whose topics could not be extracted
+            topics = None
+            try:
+                if self.topic_extractor is not None:
+                    with self.metrics.timer('topics'):
+                        topics = self.topic_extractor.candidates(tokenized.lower)
+                else:
+                    with self.metrics.timer('noun_phrases'):
+                        topics = [str(noun) for noun in blob.noun_phrases]
+            except Exception as e:
+                logger.error(f"Error in sentence topic extraction: {e}")
+
+            try:
+                with self.metrics.timer('entities'):
+                    entities = self.entity_extractor.collect(tokenized)
+            except Exception as e:
+                logger.error(f"Error in sentence entity extraction: {e}")
+                entities = {}
+
+            entries.append({
+                'primary_emotion': emotion_data['primary_emotion'],
+                'primary_score': emotion_data['primary_score'],
+                'all_emotions': emotion_data['all_emotions'],
+                'positive': positive,
+                'polarity': polarity,
+                'topics': topics,
+                'entities': entities,
+                'tokens': len(tokenized.tokens),
+                'embedding': embeddings[i] if embeddings is not None else None
+            })
+        return entries
+
+    def aggregate_context(self, entries, weights, emotion_data):
+        """Document context from sentence memo entries, like extract_context"""
+        total = sum(weights)
+        if self.models_loaded and self.combined:
+            sentiment_result = self.sentiment_from_emotions(emotion_data['all_emotions'])
+        elif all(entry['positive'] is not None for entry in entries):
+            positive = sum(weight * entry['positive'] for weight, entry in zip(weights, entries)) / total
+            sentiment_result = {'label': 'POSITIVE', 'score': positive} if positive >= 0.5 \
+                else {'label': 'NEGATIVE', 'score': 1 - positive}
+        else:
+            polarity = sum(weight * entry['polarity'] for weight, entry in zip(weights, entries)
+                           if entry['polarity'] is not None) / total
+            sentiment_result = self.polarity_sentiment(polarity)
+
+        if any(entry['topics'] is None for entry in entries):
+            topics = ['general']
+        elif self.topic_extractor is not None:
+            topics = self.topic_extractor.rank([phrase for entry in entries for phrase in entry['topics']])
+        else:
+            topics = [phrase for entry in entries for phrase in entry['topics']][:5]
+
+        offsets = np.cumsum([0] + [entry['tokens'] for entry in entries[:-1]]).tolist()
+        merged = self.entity_extractor.merge([entry['entities'] for entry in entries], offsets)
+        entities = [name for name, _, _ in self.entity_extractor.rank(merged.values())[:3]]
+
+        return {
+            'topics': topics,
+            'sentiment': sentiment_result['label'],
+            'intensity': sentiment_result['score'],
+            'key_entities': entities
+        }
+
+    def analyze_batch(self, texts, batch_size=32, workers=4):
+        """Analyze many texts at once using length-bucketed model batches
+
+        Returns one {'emotion', 'context', 'suggestions'} dict per input text,
+        in input order. Texts are sorted by length so each batch pads to a
+        similar size, and the TextBlob/regex work for a batch runs on a thread
+        pool while the models process the next batch.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        if self.cache is None:
+            return self.analyze_batch_uncached(texts, batch_size, workers)
+
+        model_identity = self.model_identity()
+        keys = [self.cache.make_key(text, model_identity) for text in texts]
+        results = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        self.metrics.count('cache_hit', len(texts) - len(missing))
+        self.metrics.count('cache_miss', len(missing))
+        if missing:
+            computed = self.analyze_batch_uncached([texts[i] for i in missing], batch_size, workers)
+            for i, result in zip(missing, computed):
+                self.cache.put(keys[i], result)
+                results[i] = result
+
+        return results
+
+    def analyze_batch_uncached(self, texts, batch_size=32, workers=4):
+        """Batch analysis without consulting the cache"""
+        if not (self.cascade and self.models_loaded):
+            return self.analyze_batch_models(texts, batch_size, workers)
+
+        fast, escalated = self.route_cascade(texts)
+        results = [None] * len(texts)
+        if escalated:
+            computed = self.analyze_batch_models([texts[i] for i in escalated], batch_size, workers)
+            for i, result in zip(escalated, computed):
+                results[i] = result
+        for i, (emotion_data, sentiment_result) in fast.items():
+            results[i] = self.finish_analysis(texts[i], emotion_data, sentiment_result)
+        return results
+
+    def analyze_batch_models(self, texts, batch_size=32, workers=4):
+        """Batch analysis with the models scoring every text"""
+        model_seconds = 0.0
+        start = time.perf_counter()
+        # Bucket by token count so padding inside each batch stays small
+        lengths = self.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        futures = [None] * len(texts)
+        model_seconds += time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for offset in range(0, len(order), batch_size):
+                indices = order[offset:offset + batch_size]
+                batch = [texts[i] for i in indices]
+                start = time.perf_counter()
+
+                embeddings = None
+                if self.embeddings:
+                    emotion_batch, embeddings = self.classify_emotions_batch(batch, with_embeddings=True)
+                else:
+                    emotion_batch = self.classify_emotions_batch(batch)
+                if self.combined:
+                    if isinstance(emotion_batch, EmotionScores):
+                        sentiment_batch = self.sentiments_from_scores(emotion_batch)
+                    else:
+                        sentiment_batch = [None] * len(batch)
+                else:
+                    sentiment_batch = self.classify_sentiment_batch(batch)
+                model_seconds += time.perf_counter() - start
+
+                if embeddings is None:
+                    embeddings = [None] * len(batch)
+                for i, text, emotion_data, sentiment_result, embedding in zip(
+                        indices, batch, emotion_batch, sentiment_batch, embeddings):
+                    futures[i] = executor.submit(self.finish_analysis, text, emotion_data, sentiment_result, embedding)
+
+            if self.cascade:
+                self.record_model_tier(model_seconds)
+            return [future.result() for future in futures]
+
+    def token_lengths(self, texts):
+        """Emotion model token counts, or character counts without the model
+
+        The tokenizations are cached, so the model calls that follow reuse them.
+        """
+        preprocessor = getattr(self.emotion_classifier, 'preprocessor', None)
+        if not self.models_loaded or preprocessor is None:
+            return [len(text) for text in texts]
+        with self.metrics.timer('model_tokenize'):
+            return preprocessor.token_lengths(texts)
+
+    def classify_emotions_batch(self, batch, with_embeddings=False):
+        """Run the emotion model over one padded batch
+
+        Returns an EmotionScores, whose rows turn into emotion data dicts
+        when indexed, or one None per text if the model is unavailable. With
+        with_embeddings, returns (scores, pooled embedding array or None)
+        from the same forward pass.
+        """
+        failed = [None] * len(batch)
+        if not self.models_loaded:
+            return (failed, None) if with_embeddings else failed
+
+        try:
+            self.metrics.batch(len(batch))
+            with self.metrics.timer('emotion_model'):
+                return self.score_with_model(batch, len(batch), pooled=with_embeddings)
+
+        except Exception as e:
+            logger.error(f"Error in batch emotion analysis: {e}")
+            return (failed, None) if with_embeddings else failed
+
+    def classify_sentiment_batch(self, batch):
+        """Run the sentiment model over one padded batch"""
+        if not self.models_loaded:
+            return [None] * len(batch)
+
+        try:
+            with self.metrics.timer('sentiment_model'):
+                return self.sentiment_analyzer(batch, batch_size=len(batch))
+
+        except Exception as e:
+            logger.error(f"Error in batch sentiment analysis: {e}")
+            return [None] * len(batch)
+
+    def finish_analysis(self, text, emotion_data=None, sentiment_result=None, embedding=None):
+        """Complete the per-text analysis given any precomputed model outputs"""
+        tokenized = None
+        if self.topic_extractor is not None:
+            with self.metrics.timer('tokenize'):
+                tokenized = TokenizedText(text)
+
+        # One TextBlob per request, so the fallback emotion scoring, the
+        # fallback sentiment and the noun phrases share a single tokenization
+        # and polarity. It is only needed without the models or for topics.
+        blob = TextBlob(text) if not self.models_loaded or self.topic_extractor is None else None
+
+        if emotion_data is None:
+            emotion_data = self.analyze_emotion(text, tokenized, blob)
+        context = self.extract_context(text, sentiment_result, tokenized, blob)
+        with self.metrics.timer('suggestions'):
+            suggestions = self.get_suggestions(emotion_data, context)
+
+        result = {
+            'emotion': emotion_data,
+            'context': context,
+            'suggestions': suggestions
+        }
+        if self.embeddings:
+            # None when the models were unavailable (fallback analysis)
+            result['embedding'] = [float(value) for value in embedding] if embedding is not None else None
+        return result
+
+    def get_suggestions(self, emotion_data, context):
+        """Provide suggestions based on emotion and context
+
+        Looked up in SUGGESTION_TABLE, which holds every combination of
+        emotion, intensity band and sentiment.
+        """
+        primary_emotion = emotion_data['primary_emotion']
+        if primary_emotion not in EMOTION_SUGGESTIONS:
+            primary_emotion = 'neutral'
+        sentiment = context['sentiment'] if context['sentiment'] in ('POSITIVE', 'NEGATIVE') else None
+        band = int(intensity_bands(emotion_data['emotional_intensity']))
+        return list(SUGGESTION_TABLE[(primary_emotion, band, sentiment)])
 
-        return suggestions
+    def get_suggestions_batch(self, scores, sentiments):
+        """Suggestions for every row of an EmotionScores given sentiment labels"""
+        columns = [label if label in EMOTION_SUGGESTIONS else 'neutral' for label in scores.labels]
+        emotions = [columns[column] for column in scores.primary_index.tolist()]
+        bands = intensity_bands(scores.intensity).tolist()
+        return [
+            list(SUGGESTION_TABLE[(emotion, band, sentiment if sentiment in ('POSITIVE', 'NEGATIVE') else None)])
+            for emotion, band, sentiment in zip(emotions, bands, sentiments)
+        ]
@@ -0,0 +1,147 @@
+import re
+
+from topics import TokenizedText, STOPWORDS, PUNCTUATION
+
+# A capitalized word, optionally possessive ("Sarah's")
+CAPITALIZED_PATTERN = re.compile(r"[A-Z][a-z]+(?:'s)?$")
+PLACE_INDICATORS = frozenset(['at', 'in', 'from', 'to'])
+
+# Ranking weights per source; ties break on frequency, then first position
+SOURCE_WEIGHTS = {
+    'gazetteer': 3.0,
+    'name': 2.0,
+    'place': 2.0,
+    'context': 1.0
+}
+
+
+class EntityExtractor:
+    """Ranked, deterministic extraction of names and places
+
+    Works in a single pass over a TokenizedText: pairs of capitalized words
+    are names, the word after 'at'/'in'/'from'/'to' is a likely place, and
+    an optional gazetteer of known people and places is matched through a
+    hash index of lowercased phrases, so lookups cost the same for ten names
+    or a few hundred thousand.
+    """
+
+    def __init__(self, gazetteer=None):
+        # {lowercased phrase: (display name, entity type)}
+        self.gazetteer = {}
+        self.max_phrase_len = 1
+        for name, entity_type in (gazetteer or {}).items():
+            self.add(name, entity_type)
+
+    def add(self, name, entity_type='entity'):
+        words = [token.lower() for token in TokenizedText(name).tokens if token not in PUNCTUATION]
+        if not words:
+            return
+        self.gazetteer[" ".join(words)] = (name, entity_type)
+        self.max_phrase_len = max(self.max_phrase_len, len(words))
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a gazetteer with one 'type<TAB>name' or bare 'name' per line"""
+        extractor = cls()
+        with open(path, encoding='utf-8') as gazetteer_file:
+            for line in gazetteer_file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                entity_type, _, name = line.rpartition('\t')
+                extractor.add(name.strip(), entity_type.strip() or 'entity')
+        return extractor
+
+    def extract_ranked(self, text):
+        """Return (name, type, score) tuples, best first"""
+        return self.rank(self.collect(text).values())
+
+    def collect(self, text):
+        """Unranked entities keyed by lowercased name, before any ranking"""
+        tokenized = text if isinstance(text, TokenizedText) else TokenizedText(text)
+        tokens = tokenized.tokens
+        lower = tokenized.lower
+        # {lowercased name: [display name, type, best weight, count, first position]}
+        found = {}
+
+        def record(name, entity_type, source, position):
+            key = name.lower()
+            entry = found.get(key)
+            weight = SOURCE_WEIGHTS[source]
+            if entry is None:
+                found[key] = [name, entity_type, weight, 1, position]
+                return
+            entry[3] += 1
+            if weight > entry[2]:
+                entry[0], entry[1], entry[2] = name, entity_type, weight
+
+        covered_until = 0
+        for i, token in enumerate(tokens):
+            if token in PUNCTUATION:
+                continue
+
+            # Gazetteer phrases, longest first
+            if self.gazetteer:
+                for length in range(min(self.max_phrase_len, len(tokens) - i), 0, -1):
+                    key = lower[i] if length == 1 else " ".join(lower[i:i + length])
+                    match = self.gazetteer.get(key)
+                    if match is not None:
+                        record(match[0], match[1], 'gazetteer', i)
+                        covered_until = max(covered_until, i + length)
+                        break
+
+            # Two capitalized words in a row look like a name
+            if i >= covered_until and i + 1 < len(tokens) and CAPITALIZED_PATTERN.match(token) \
+                    and CAPITALIZED_PATTERN.match(tokens[i + 1]):
+                name = f"{token} {tokens[i + 1]}"
+                if name.endswith("'s"):
+                    name = name[:-2]
+                record(name, 'person', 'name', i)
+                covered_until = i + 2
+
+            # What follows a place indicator is a likely place; a capitalized
+            # run ("New York") is kept whole and not re-read as a person
+            if lower[i] in PLACE_INDICATORS and i + 1 < len(tokens):
+                following = tokens[i + 1]
+                if CAPITALIZED_PATTERN.match(following):
+                    end = i + 2
+                    while end < len(tokens) and end - i <= 3 and CAPITALIZED_PATTERN.match(tokens[end]):
+                        end += 1
+                    record(" ".join(tokens[i + 1:end]), 'place', 'place', i + 1)
+                    covered_until = max(covered_until, end)
+                elif following.isalpha() and lower[i + 1] not in STOPWORDS:
+                    record(following.title(), 'place', 'context', i + 1)
+
+        return found
+
+    @staticmethod
+    def merge(collected, offsets):
+        """Combine collect() results of consecutive pieces of one text
+
+        offsets are each piece's first token position within the text. The
+        result ranks like collect() over the whole text, as long as the
+        pieces split on punctuation (sentences do).
+        """
+        merged = {}
+        for found, offset in zip(collected, offsets):
+            for key, (name, entity_type, weight, count, position) in found.items():
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = [name, entity_type, weight, count, position + offset]
+                    continue
+                entry[3] += count
+                if weight > entry[2]:
+                    entry[0], entry[1], entry[2] = name, entity_type, weight
+        return merged
+
+    @staticmethod
+    def rank(entries):
+        ranked = sorted(entries, key=lambda entry: (-entry[2], -entry[3], entry[4]))
+        return [(name, entity_type, weight) for name, entity_type, weight, _, _ in ranked]
+
+    def extract(self, text, limit=3):
+        """Top entity names for a text or TokenizedText"""
+        return [name for name, _, _ in self.extract_ranked(text)[:limit]]
+
+    def extract_batch(self, texts, limit=3):
+        return [self.extract(text, limit) for text in texts]
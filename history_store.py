@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+WEEK_OFFSET_DAYS = 3
+
+
+class EmotionHistory:
+    """Append-only, per-user columnar store of analysis results
+
+    Each user gets a directory of flat binary columns that are appended to
+    and read back through np.memmap:
+
+    - scores.f32: one float32 row of emotion scores per entry
+    - timestamps.f64: entry times in epoch seconds
+    - daily.f64 / weekly.f64: one row per day/week holding
+      [period index, entry count, per-emotion score sums]
+
+    Daily and weekly rows, dominant-emotion counts and streaks are updated
+    as each entry is appended, so trends are read without touching the raw
+    entries. Entries must arrive in time order; a new entry for the
+    current (or an earlier, already present) day is folded into that day.
+    """
+
+    def __init__(self, root, utc_offset_hours=0):
+        self.root = root
+        self.utc_offset = utc_offset_hours * 3600
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def user_dir(self, user_id):
+        safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', str(user_id)) or '_'
+        return os.path.join(self.root, safe_id)
+
+    def load_state(self, user_id):
+        path = os.path.join(self.user_dir(user_id), 'state.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as state_file:
+            return json.load(state_file)
+
+    def save_state(self, user_id, state):
+        path = os.path.join(self.user_dir(user_id), 'state.json')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, path)
+
+    def append(self, user_id, emotion_data, timestamp=None):
+        """Add one analysis result (the analyze_emotion dict) to a user's history
+
+        Returns the entry's number, usable as its id in a VectorIndex.
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+
+        with self.lock:
+            directory = self.user_dir(user_id)
+            os.makedirs(directory, exist_ok=True)
+            state = self.load_state(user_id) or {
+                'labels': sorted(emotion_data['all_emotions']),
+                'count': 0,
+                'last_timestamp': None,
+                'last_day': None,
+                'day_streak': 0,
+                'longest_day_streak': 0,
+                'last_dominant': None,
+                'dominant_streak': 0,
+                'dominant_counts': {}
+            }
+
+            labels = state['labels']
+            scores = np.array([emotion_data['all_emotions'].get(label, 0.0) for label in labels], dtype=np.float32)
+            dominant = emotion_data['primary_emotion']
+
+            # Aggregates first: they reject out-of-order entries before anything is written
+            day = self.day_index(timestamp)
+            self.add_to_period(os.path.join(directory, 'daily.f64'), day, scores)
+            self.add_to_period(os.path.join(directory, 'weekly.f64'), self.week_index(day), scores)
+
+            count = state['count']
+            self.write_row(os.path.join(directory, 'scores.f32'), count * scores.nbytes, scores.tobytes())
+            self.write_row(os.path.join(directory, 'timestamps.f64'), count * 8, np.float64(timestamp).tobytes())
+
+            # Consecutive days with at least one entry
+            if state['last_day'] is None or day > state['last_day'] + 1:
+                state['day_streak'] = 1
+            elif day == state['last_day'] + 1:
+                state['day_streak'] += 1
+            state['longest_day_streak'] = max(state['longest_day_streak'], state['day_streak'])
+
+            # Consecutive entries sharing the same dominant emotion
+            if dominant == state['last_dominant']:
+                state['dominant_streak'] += 1
+            else:
+                state['dominant_streak'] = 1
+            state['dominant_counts'][dominant] = state['dominant_counts'].get(dominant, 0) + 1
+
+            state['count'] += 1
+            state['last_timestamp'] = max(timestamp, state['last_timestamp'] or timestamp)
+            state['last_day'] = max(day, state['last_day'] if state['last_day'] is not None else day)
+            state['last_dominant'] = dominant
+            self.save_state(user_id, state)
+            return count
+
+    @staticmethod
+    def write_row(path, offset, data):
+        """Write a row at offset, dropping anything a crashed append left behind"""
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as column:
+            column.seek(offset)
+            column.write(data)
+            column.truncate()
+
+    def day_index(self, timestamp):
+        return int((timestamp + self.utc_offset) // SECONDS_PER_DAY)
+
+    @staticmethod
+    def week_index(day):
+        return (day + WEEK_OFFSET_DAYS) // 7
+
+    @staticmethod
+    def add_to_period(path, period, scores):
+        """Fold scores into the row for period, appending a row if it is new"""
+        width = len(scores) + 2
+        row_bytes = width * 8
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        rows = size // row_bytes
+
+        with open(path, 'r+b' if size else 'wb') as column:
+            position = rows
+            if rows:
+                # Entries arrive in order, so the period is almost always the last row
+                column.seek((rows - 1) * row_bytes)
+                last_period = np.frombuffer(column.read(8), dtype=np.float64)[0]
+                if last_period == period:
+                    position = rows - 1
+                elif last_period > period:
+                    periods = np.memmap(path, dtype=np.float64, mode='r', shape=(rows, width))[:, 0]
+                    position = int(np.searchsorted(periods, period))
+                    if position >= rows or periods[position] != period:
+                        raise ValueError("History entries must be appended in time order")
+
+            if position < rows:
+                column.seek(position * row_bytes)
+                row = np.frombuffer(column.read(row_bytes), dtype=np.float64).copy()
+            else:
+                row = np.zeros(width, dtype=np.float64)
+                row[0] = period
+
+            row[1] += 1
+            row[2:] += scores
+            column.seek(position * row_bytes)
+            column.write(row.tobytes())
+
+    def read_period(self, user_id, name):
+        state = self.load_state(user_id)
+        path = os.path.join(self.user_dir(user_id), f'{name}.f64')
+        if state is None or not os.path.exists(path):
+            return None, np.zeros((0, 0))
+        width = len(state['labels']) + 2
+        rows = os.path.getsize(path) // (width * 8)
+        return state, np.memmap(path, dtype=np.float64, mode='r', shape=(rows, width))
+
+    def period_means(self, user_id, name, start=None, end=None):
+        state, table = self.read_period(user_id, name)
+        if state is None or not len(table):
+            return {'labels': state['labels'] if state else [], 'periods': np.array([], dtype=np.int64),
+                    'counts': np.array([]), 'means': np.zeros((0, 0))}
+
+        periods = table[:, 0].astype(np.int64)
+        low = 0 if start is None else int(np.searchsorted(periods, start))
+        high = len(periods) if end is None else int(np.searchsorted(periods, end, side='right'))
+        table = np.asarray(table[low:high])
+
+        return {
+            'labels': state['labels'],
+            'periods': periods[low:high],
+            'counts': table[:, 1],
+            'means': table[:, 2:] / table[:, 1:2]
+        }
+
+    def daily_means(self, user_id, start=None, end=None):
+        """Per-day mean emotion scores; periods are numpy datetime64 days
+
+        start and end are datetime64[D] (or anything np.datetime64 accepts).
+        """
+        start = None if start is None else int(np.datetime64(start, 'D').astype(np.int64))
+        end = None if end is None else int(np.datetime64(end, 'D').astype(np.int64))
+        result = self.period_means(user_id, 'daily', start, end)
+        result['periods'] = result['periods'].astype('datetime64[D]')
+        return result
+
+    def weekly_means(self, user_id):
+        """Per-week mean emotion scores; periods are the Monday of each week"""
+        result = self.period_means(user_id, 'weekly')
+        mondays = result['periods'] * 7 - WEEK_OFFSET_DAYS
+        result['periods'] = mondays.astype('datetime64[D]')
+        return result
+
+    def entries(self, user_id):
+        """Memory-mapped (timestamps, scores) for every entry of a user"""
+        state = self.load_state(user_id)
+        if state is None or not state['count']:
+            return np.zeros(0), np.zeros((0, 0), dtype=np.float32)
+        directory = self.user_dir(user_id)
+        count = state['count']
+        timestamps = np.memmap(os.path.join(directory, 'timestamps.f64'), dtype=np.float64, mode='r', shape=(count,))
+        scores = np.memmap(os.path.join(directory, 'scores.f32'), dtype=np.float32, mode='r',
+                           shape=(count, len(state['labels'])))
+        return timestamps, scores
+
+    def summary(self, user_id):
+        """Entry count, streaks and dominant-emotion counts"""
+        state = self.load_state(user_id)
+        if state is None:
+            return {'count': 0, 'day_streak': 0, 'longest_day_streak': 0, 'dominant_counts': {},
+                    'dominant_streak': 0, 'last_dominant': None}
+
+        # The day streak only counts if it reaches today or yesterday
+        today = self.day_index(time.time())
+        day_streak = state['day_streak'] if state['last_day'] >= today - 1 else 0
+        return {
+            'count': state['count'],
+            'day_streak': day_streak,
+            'longest_day_streak': state['longest_day_streak'],
+            'dominant_counts': state['dominant_counts'],
+            'dominant_streak': state['dominant_streak'],
+            'last_dominant': state['last_dominant']
+        }
@@ -0,0 +1,318 @@
+import os
+import time
+import logging
+import argparse
+import numpy as np
+
+from preprocessing import TokenPreprocessor, MAX_MODEL_TOKENS
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+# The transformer backends plus the distilled student (see student_model)
+EMOTION_BACKENDS = BACKENDS + ('student',)
+
+# What pipeline("sentiment-analysis") loads when no model is given
+DEFAULT_SENTIMENT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+
+
+def build_emotion_classifier(backend, model_name, onnx_dir=None):
+    """Build an emotion classifier callable for the given backend
+
+    Every backend is called like a transformers text-classification pipeline
+    with return_all_scores=True: a string or list of strings in, one list of
+    {'label', 'score'} dicts per text out. classify() returns the scores
+    together with the mean-pooled encoder output from the same forward pass.
+    """
+    if backend == 'pytorch':
+        return TorchClassifier.from_pretrained(model_name)
+
+    if backend == 'quantized':
+        return TorchClassifier.from_pretrained(model_name, quantize=True)
+
+    if backend == 'onnx':
+        return OnnxEmotionClassifier(model_name, onnx_dir=onnx_dir)
+
+    if backend == 'student':
+        # model_name is the directory student_model.py saved the student to
+        from student_model import StudentClassifier
+        return StudentClassifier.load(model_name)
+
+    raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(EMOTION_BACKENDS)})")
+
+
+def build_sentiment_classifier(model_name=None):
+    """PyTorch sentiment classifier returning the top label, like pipeline("sentiment-analysis")"""
+    return TorchClassifier.from_pretrained(model_name or DEFAULT_SENTIMENT_MODEL, all_scores=False)
+
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(shifted)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def mean_pool(hidden, attention_mask):
+    """Average token vectors over the non-padding positions"""
+    mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+    return (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+
+
+class TokenizedClassifier:
+    """Pipeline-compatible sequence classifier over a TokenPreprocessor
+
+    Texts are tokenized once (with a cache for repeats), truncated by token
+    budget and run in length-sorted batches padded only to their longest
+    member. Subclasses implement forward(input_ids, attention_mask, pooled),
+    returning NumPy (logits, pooled embeddings or None).
+
+    Each text gets every label's score, or with all_scores=False only the
+    top {'label', 'score'} dict, like the sentiment-analysis pipeline.
+    """
+
+    def __init__(self, tokenizer, labels, all_scores=True, max_tokens=MAX_MODEL_TOKENS):
+        self.preprocessor = TokenPreprocessor(tokenizer, max_tokens)
+        self.labels = labels
+        self.all_scores = all_scores
+
+    def __call__(self, texts, batch_size=None, **kwargs):
+        return self.scores_from_probs(self.probabilities(texts, batch_size)[0])
+
+    def classify(self, texts, batch_size=None, **kwargs):
+        """Scores per text plus a float32 (texts, hidden size) embedding array"""
+        probs, embeddings = self.probabilities(texts, batch_size, pooled=True)
+        return self.scores_from_probs(probs), embeddings
+
+    def probabilities(self, texts, batch_size=None, pooled=False):
+        """(texts, labels) float32 softmax matrix in self.labels order
+
+        Returns (probabilities, pooled embeddings or None) without building
+        any per-label dicts.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        embeddings = None
+        for positions, input_ids, attention_mask in self.preprocessor.batches(texts, batch_size):
+            logits, vectors = self.forward(input_ids, attention_mask, pooled)
+            probs[positions] = softmax(logits)
+            if vectors is not None:
+                if embeddings is None:
+                    embeddings = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+                embeddings[positions] = vectors
+
+        return probs, embeddings
+
+    def forward(self, input_ids, attention_mask, pooled):
+        raise NotImplementedError
+
+    def scores_from_probs(self, probs):
+        """Pipeline-style label/score lists (or top dicts) from a probability matrix"""
+        if not self.all_scores:
+            return [{'label': self.labels[row.argmax()], 'score': float(row.max())} for row in probs]
+        return [
+            [{'label': label, 'score': float(score)} for label, score in zip(self.labels, row)]
+            for row in probs
+        ]
+
+
+class TorchClassifier(TokenizedClassifier):
+    """PyTorch sequence classification model, optionally int8-quantized"""
+
+    def __init__(self, model, tokenizer, all_scores=True, max_tokens=MAX_MODEL_TOKENS):
+        import torch
+
+        self.torch = torch
+        self.model = model
+        model.eval()
+        labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+        super().__init__(tokenizer, labels, all_scores, max_tokens)
+
+    @classmethod
+    def from_pretrained(cls, model_name, quantize=False, **kwargs):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        if quantize:
+            # Dynamic int8 quantization of the Linear layers
+            model.eval()
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return cls(model, tokenizer, **kwargs)
+
+    def forward(self, input_ids, attention_mask, pooled):
+        torch = self.torch
+        mask = torch.from_numpy(attention_mask)
+        with torch.inference_mode():
+            outputs = self.model(
+                input_ids=torch.from_numpy(input_ids),
+                attention_mask=mask,
+                output_hidden_states=pooled
+            )
+            logits = outputs.logits.float().numpy()
+            vectors = mean_pool(outputs.hidden_states[-1], mask).float().numpy() if pooled else None
+        return logits, vectors
+
+
+class OnnxEmotionClassifier(TokenizedClassifier):
+    """ONNX Runtime session exposing the pipeline call interface"""
+
+    def __init__(self, model_name, onnx_dir=None, max_length=MAX_MODEL_TOKENS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer, AutoConfig
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        config = AutoConfig.from_pretrained(model_name)
+        super().__init__(tokenizer, [config.id2label[i] for i in range(config.num_labels)], max_tokens=max_length)
+
+        onnx_dir = onnx_dir or os.path.join(".onnx", model_name.replace("/", "__"))
+        onnx_path = os.path.join(onnx_dir, "model.onnx")
+        if not os.path.exists(onnx_path):
+            export_onnx(model_name, onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        if "pooled" not in {output.name for output in self.session.get_outputs()}:
+            # Exported before the pooled output existed
+            export_onnx(model_name, onnx_path)
+            self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {session_input.name for session_input in self.session.get_inputs()}
+
+    def forward(self, input_ids, attention_mask, pooled):
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+        outputs = self.session.run(["logits", "pooled"] if pooled else ["logits"], feeds)
+        return outputs[0], outputs[1] if pooled else None
+
+
+def export_onnx(model_name, onnx_path):
+    """Export a sequence classification model to ONNX with dynamic axes
+
+    The graph has two outputs: the classifier logits and the mean-pooled
+    last hidden state ("pooled") used for similarity search.
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    class PooledOutputModel(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, output_hidden_states=True)
+            return outputs.logits, mean_pool(outputs.hidden_states[-1], attention_mask)
+
+    logger.info(f"Exporting {model_name} to ONNX at {onnx_path}...")
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    dynamic_axes["pooled"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            PooledOutputModel(model),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits", "pooled"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False
+        )
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is peak KB on Linux; the best we can do without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compare_backends(texts, model_name, backends=BACKENDS, runs=3, onnx_dir=None):
+    """Check parity against PyTorch and measure latency and memory per backend
+
+    Returns a dict per backend with load time, RSS growth, mean and p95
+    per-text latency, max absolute score difference and top-label agreement
+    with the PyTorch reference.
+    """
+    report = {}
+    reference = None
+
+    for backend in backends:
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        classifier = build_emotion_classifier(backend, model_name, onnx_dir=onnx_dir)
+        load_time = time.perf_counter() - start
+
+        outputs = [classifier(text)[0] for text in texts]  # warm-up and parity sample
+        latencies = []
+        for _ in range(runs):
+            for text in texts:
+                start = time.perf_counter()
+                classifier(text)
+                latencies.append(time.perf_counter() - start)
+
+        scores = np.array([[item['score'] for item in sorted(output, key=lambda x: x['label'])] for output in outputs])
+        entry = {
+            'load_seconds': load_time,
+            'rss_growth_mb': current_rss_mb() - rss_before,
+            'mean_latency_ms': float(np.mean(latencies) * 1000),
+            'p95_latency_ms': float(np.percentile(latencies, 95) * 1000)
+        }
+
+        if reference is None:
+            reference = scores
+        else:
+            entry['max_abs_diff'] = float(np.abs(scores - reference).max())
+            entry['top_label_agreement'] = float(np.mean(scores.argmax(axis=1) == reference.argmax(axis=1)))
+            entry['speedup'] = report[backends[0]]['mean_latency_ms'] / entry['mean_latency_ms']
+
+        report[backend] = entry
+        del classifier
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare emotion classifier inference backends")
+    parser.add_argument("--model", default="j-hartmann/emotion-english-distilroberta-base",
+                        help="Hub name or local path of the emotion model")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--onnx-dir", default=None)
+    args = parser.parse_args()
+
+    texts = [
+        "I'm so excited about my vacation next week! I can't wait to relax on the beach.",
+        "I'm really frustrated with my team at work. They never listen to my ideas.",
+        "I feel lonely and isolated lately. I miss spending time with my friends.",
+        "The news about climate change makes me worried about the future.",
+        "I accomplished all my goals today and feel incredibly proud of myself!"
+    ]
+
+    report = compare_backends(texts, args.model, backends=args.backends, runs=args.runs, onnx_dir=args.onnx_dir)
+    for backend, entry in report.items():
+        details = ", ".join(f"{key}={value:.4g}" for key, value in entry.items())
+        print(f"{backend}: {details}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
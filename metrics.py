@@ -0,0 +1,279 @@
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "moodai"
+
+# Histogram bucket upper bounds; seconds for stage timings, texts for batch sizes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+METRIC_HELP = {
+    'stage_seconds': "Time spent in each analysis stage",
+    'batch_size': "Number of texts per model batch",
+    'events_total': "Counted analyzer events such as cache hits and fallback activations",
+    'model_load_seconds': "Time taken by the last model load",
+    'warmup_seconds': "Time taken by the warm-up batch after the last model load"
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile from the buckets (upper bound of the matching bucket)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """In-process histograms, counters and gauges keyed by name and labels"""
+
+    def __init__(self, buckets=None):
+        self.buckets = {'batch_size': BATCH_SIZE_BUCKETS}
+        self.buckets.update(buckets or {})
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def observe(self, name, value, labels=None):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, labels=None):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, labels=None):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def request_finished(self, breakdown):
+        pass
+
+    def snapshot(self):
+        """Plain-dict view of every metric, for logging or tests"""
+        with self.lock:
+            return {
+                'histograms': {
+                    format_series(name, labels): {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'p50': histogram.quantile(0.5),
+                        'p95': histogram.quantile(0.95),
+                        'p99': histogram.quantile(0.99)
+                    }
+                    for (name, labels), histogram in self.histograms.items()
+                },
+                'counters': {format_series(name, labels): value for (name, labels), value in self.counters.items()},
+                'gauges': {format_series(name, labels): value for (name, labels), value in self.gauges.items()}
+            }
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for metric_type, series in (('histogram', self.histograms),
+                                        ('counter', self.counters),
+                                        ('gauge', self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    full_name = f"{METRIC_PREFIX}_{name}"
+                    lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {full_name} {metric_type}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name != name:
+                            continue
+                        if metric_type == 'histogram':
+                            lines.extend(render_histogram(full_name, labels, value))
+                        else:
+                            lines.append(f"{full_name}{render_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class LogSink:
+    """Structured JSON log lines for finished requests and model loads
+
+    Per-stage observations are only logged when log_stages is set, since
+    they are far more frequent than requests.
+    """
+
+    def __init__(self, log=None, level=logging.INFO, log_stages=False):
+        self.log = log or logger
+        self.level = level
+        self.log_stages = log_stages
+
+    def emit(self, event, **fields):
+        self.log.log(self.level, json.dumps({'event': event, **fields}))
+
+    def observe(self, name, value, labels=None):
+        if self.log_stages:
+            self.emit(name, value=value, **(labels or {}))
+
+    def inc(self, name, amount=1, labels=None):
+        pass
+
+    def set_gauge(self, name, value, labels=None):
+        self.emit(name, value=value, **(labels or {}))
+
+    def request_finished(self, breakdown):
+        self.emit('request', **{f"{stage}_ms": round(seconds * 1000, 3) for stage, seconds in breakdown.items()})
+
+
+class Instrumentation:
+    """Collects analyzer timings and events and fans them out to sinks
+
+    Always records into its own MetricsRegistry; extra sinks (for example a
+    LogSink) get the same events. The per-request breakdown of the most
+    recent request on each thread is available from last_request().
+    """
+
+    def __init__(self, sinks=None, enabled=True):
+        self.registry = MetricsRegistry()
+        self.sinks = [self.registry] + list(sinks or [])
+        self.enabled = enabled
+        self.local = threading.local()
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one analysis stage"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_stage(self, stage, seconds):
+        if not self.enabled:
+            return
+        labels = {'stage': stage}
+        for sink in self.sinks:
+            sink.observe('stage_seconds', seconds, labels)
+
+        breakdown = getattr(self.local, 'breakdown', None)
+        if breakdown is not None:
+            breakdown[stage] = breakdown.get(stage, 0.0) + seconds
+
+    def count(self, event, amount=1):
+        if not self.enabled:
+            return
+        labels = {'event': event}
+        for sink in self.sinks:
+            sink.inc('events_total', amount, labels)
+
+    def batch(self, size):
+        if not self.enabled:
+            return
+        for sink in self.sinks:
+            sink.observe('batch_size', size)
+
+    def gauge(self, name, value):
+        for sink in self.sinks:
+            sink.set_gauge(name, value)
+
+    @contextmanager
+    def request(self):
+        """Collect a per-stage breakdown for the enclosed request
+
+        Nested requests fold into the outermost one.
+        """
+        if not self.enabled or getattr(self.local, 'breakdown', None) is not None:
+            yield
+            return
+
+        breakdown = self.local.breakdown = {}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            breakdown['total'] = time.perf_counter() - start
+            self.local.breakdown = None
+            self.local.last = breakdown
+            for sink in self.sinks:
+                sink.request_finished(breakdown)
+
+    def last_request(self):
+        """Stage timings in seconds for this thread's most recent request"""
+        return getattr(self.local, 'last', None)
+
+
+def format_series(name, labels):
+    return f"{name}{render_labels(labels)}"
+
+
+def render_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def render_histogram(full_name, labels, histogram):
+    lines = []
+    running = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        running += count
+        lines.append(f"{full_name}_bucket{render_labels(labels + (('le', bound),))} {running}")
+    lines.append(f"{full_name}_bucket{render_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+    lines.append(f"{full_name}_sum{render_labels(labels)} {histogram.sum}")
+    lines.append(f"{full_name}_count{render_labels(labels)} {histogram.count}")
+    return lines
+
+
+def serve_prometheus(registry, port=9100, host="0.0.0.0"):
+    """Serve registry.render_prometheus() at /metrics on a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+
+from inference_backends import DEFAULT_SENTIMENT_MODEL, export_onnx
+from emotion_model import EmotionalAnalyzer, EMOTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "bundle.json"
+# Subdirectory of the bundle for each pipeline
+ROLES = ('emotion', 'sentiment')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as bundle_file:
+        for chunk in iter(lambda: bundle_file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bundle_files(directory):
+    """Every file in the bundle except the manifest, as sorted relative paths"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.relpath(os.path.join(root, name), directory)
+            if path != MANIFEST_NAME and not name.endswith('.tmp'):
+                files.append(path.replace(os.sep, '/'))
+    return sorted(files)
+
+
+def build_bundle(directory, emotion_model, sentiment_model=DEFAULT_SENTIMENT_MODEL, onnx=False):
+    """Snapshot both pipelines' tokenizer, config and safetensors weights
+
+    Each model goes into its own subdirectory; with onnx, the emotion model's
+    ONNX export is added too. The manifest, written last, pins the source
+    names and revisions and holds a SHA-256 for every file, so a bundle
+    without a manifest is an unfinished build.
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    models = {}
+    for role, model_name in zip(ROLES, (emotion_model, sentiment_model)):
+        target = os.path.join(directory, role)
+        logger.info(f"Saving {role} model {model_name} to {target}...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        tokenizer.save_pretrained(target)
+        model.save_pretrained(target, safe_serialization=True)
+        models[role] = {
+            'source': model_name,
+            'revision': getattr(model.config, '_commit_hash', None),
+            'path': role,
+            'onnx_dir': None
+        }
+        del model
+
+    if onnx:
+        export_onnx(os.path.join(directory, 'emotion'), os.path.join(directory, 'emotion', 'onnx', 'model.onnx'))
+        models['emotion']['onnx_dir'] = 'emotion/onnx'
+
+    import transformers
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'transformers': transformers.__version__,
+        'models': models,
+        'files': {path: file_sha256(os.path.join(directory, path)) for path in bundle_files(directory)}
+    }
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(tmp_path, manifest_path)
+    logger.info(f"Bundle written to {directory} ({len(manifest['files'])} files)")
+    return manifest
+
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No model bundle at {directory} (missing {MANIFEST_NAME})")
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported model bundle format: {manifest.get('format')}")
+    return manifest
+
+
+def bundle_paths(directory):
+    """Local paths to load each pipeline from: {'emotion', 'sentiment', 'onnx_dir'}"""
+    models = load_manifest(directory)['models']
+    onnx_dir = models['emotion'].get('onnx_dir')
+    return {
+        'emotion': os.path.join(directory, models['emotion']['path']),
+        'sentiment': os.path.join(directory, models['sentiment']['path']),
+        'onnx_dir': os.path.join(directory, onnx_dir) if onnx_dir else None
+    }
+
+
+def verify_bundle(directory):
+    """Problems found checking every file against the manifest; empty when intact"""
+    manifest = load_manifest(directory)
+    problems = []
+    for path, expected in manifest['files'].items():
+        full_path = os.path.join(directory, path)
+        if not os.path.exists(full_path):
+            problems.append(f"missing: {path}")
+        elif file_sha256(full_path) != expected:
+            problems.append(f"checksum mismatch: {path}")
+    for path in bundle_files(directory):
+        if path not in manifest['files']:
+            problems.append(f"not in manifest: {path}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, check and time offline model bundles")
+    parser.add_argument("command", choices=("build", "verify", "time"),
+                        help="build a bundle, verify its checksums, or time a cold load from it")
+    parser.add_argument("bundle", help="Bundle directory")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL, help="Hub name or local path of the emotion model")
+    parser.add_argument("--sentiment-model", default=DEFAULT_SENTIMENT_MODEL,
+                        help="Hub name or local path of the sentiment model")
+    parser.add_argument("--onnx", action="store_true", help="Also export the emotion model to ONNX")
+    parser.add_argument("--backend", default="pytorch", help="Emotion model backend to time (default: pytorch)")
+    parser.add_argument("--combined", action="store_true", help="Time a combined-mode load (emotion model only)")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_bundle(args.bundle, args.emotion_model, args.sentiment_model, args.onnx)
+        return 0
+
+    if args.command == 'verify':
+        problems = verify_bundle(args.bundle)
+        for problem in problems:
+            print(problem)
+        print("Bundle is intact" if not problems else f"{len(problems)} problem(s) found")
+        return 1 if problems else 0
+
+    analyzer = EmotionalAnalyzer(bundle=args.bundle, backend=args.backend, combined=args.combined)
+    if not analyzer.models_loaded:
+        logger.error("Models failed to load from the bundle")
+        return 1
+    print(f"Loaded in {analyzer.load_seconds:.2f}s, including a {analyzer.warmup_seconds:.2f}s warm-up")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+
+# Both bundled models (distilroberta emotion, distilbert sentiment) accept
+# at most 512 tokens including the special tokens
+MAX_MODEL_TOKENS = 512
+# Texts are cut to this many characters per token of budget before
+# tokenizing, so a huge input never costs more than a bounded tokenizer call.
+# No subword token is anywhere near this long, so the cut never lands
+# inside the part of the text the model can see.
+MAX_CHARS_PER_TOKEN = 32
+
+
+class TokenPreprocessor:
+    """Tokenize once, truncate by token budget and pad batches dynamically
+
+    Shared by every transformer classifier. Token ids are cached per input
+    text (LRU), truncated to max_tokens including special tokens, and batches
+    are sorted by token length and padded only to their longest member.
+    """
+
+    def __init__(self, tokenizer, max_tokens=MAX_MODEL_TOKENS, cache_size=4096, pad_to_multiple_of=None):
+        self.tokenizer = tokenizer
+        model_max = getattr(tokenizer, 'model_max_length', None) or max_tokens
+        self.max_tokens = min(max_tokens, model_max)
+        self.cache_size = cache_size
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+
+    def encode(self, texts):
+        """Token id arrays for each text, truncated to the token budget"""
+        encoded = [None] * len(texts)
+        missing = {}
+        with self.lock:
+            for i, text in enumerate(texts):
+                ids = self.cache.get(text)
+                if ids is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self.cache.move_to_end(text)
+                    encoded[i] = ids
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += len(missing)
+
+        if missing:
+            char_limit = self.max_tokens * MAX_CHARS_PER_TOKEN
+            batch = list(missing)
+            token_ids = self.tokenizer(
+                [text[:char_limit] for text in batch],
+                truncation=True,
+                max_length=self.max_tokens
+            )['input_ids']
+
+            with self.lock:
+                for text, ids in zip(batch, token_ids):
+                    ids = np.asarray(ids, dtype=np.int64)
+                    for i in missing[text]:
+                        encoded[i] = ids
+                    self.cache[text] = ids
+                    self.cache.move_to_end(text)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        return encoded
+
+    def pad(self, encoded):
+        """Right-pad token id arrays to the longest one: (input_ids, attention_mask)"""
+        length = max(len(ids) for ids in encoded)
+        if self.pad_to_multiple_of:
+            length = -(-length // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids = np.full((len(encoded), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encoded), length), dtype=np.int64)
+        for row, ids in enumerate(encoded):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+
+        with self.lock:
+            self.tokens += int(attention_mask.sum())
+            self.padded_tokens += attention_mask.size
+        return input_ids, attention_mask
+
+    def batches(self, texts, batch_size=None, bucket_ratio=2.0):
+        """Yield (positions, input_ids, attention_mask) over length-sorted batches
+
+        A batch holds at most batch_size texts and closes early when the next
+        text is more than bucket_ratio times longer than its shortest one, so
+        a few long texts never make a batch of short ones pad out to 512.
+        positions index into texts, so callers can restore the input order.
+        """
+        encoded = self.encode(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded[i]))
+        batch_size = batch_size or len(texts) or 1
+
+        positions = []
+        for i in order:
+            if positions and (len(positions) >= batch_size
+                              or len(encoded[i]) > bucket_ratio * len(encoded[positions[0]])):
+                yield (positions,) + self.pad([encoded[j] for j in positions])
+                positions = []
+            positions.append(i)
+        if positions:
+            yield (positions,) + self.pad([encoded[j] for j in positions])
+
+    def token_lengths(self, texts):
+        """Token counts after truncation; cached, so a later batch call reuses the work"""
+        return [len(ids) for ids in self.encode(texts)]
+
+    def stats(self):
+        """Cache hit counters and the share of model inputs spent on padding"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.cache),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'tokens': self.tokens,
+                'padding_ratio': 1 - self.tokens / self.padded_tokens if self.padded_tokens else 0.0
+            }
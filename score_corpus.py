@@ -0,0 +1,199 @@
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+from itertools import islice
+
+from emotion_model import EmotionalAnalyzer, EMOTION_MODEL
+from scoring_pool import ScoringPool
+from dedup import DedupScorer
+
+logger = logging.getLogger(__name__)
+
+
+def read_jsonl(path, position):
+    """Yield (record, position) pairs from a JSONL file
+
+    position is the byte offset just past the record, so a run can resume by
+    seeking straight back to it.
+    """
+    with open(path, 'rb') as corpus:
+        corpus.seek(position)
+        while True:
+            line = corpus.readline()
+            if not line:
+                break
+            position = corpus.tell()
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                logger.error(f"Skipping malformed JSON line ending at byte {position}: {e}")
+                continue
+            yield record, position
+
+
+def read_csv(path, position):
+    """Yield (record, position) pairs from a CSV file with a header row
+
+    position is the number of data rows consumed; quoted fields may span
+    lines, so rows are skipped rather than seeked past on resume.
+    """
+    with open(path, newline='', encoding='utf-8') as corpus:
+        reader = csv.DictReader(corpus)
+        for record in islice(reader, position, None):
+            position += 1
+            yield record, position
+
+
+def iter_batches(records, batch_size):
+    """Group the record stream into lists of at most batch_size items"""
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as checkpoint:
+        return json.load(checkpoint)
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically so a crash never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(tmp_path, path)
+
+
+def score_corpus(scorer, input_path, output_path, text_field='text', id_field=None,
+                 input_format=None, batch_size=64, checkpoint_path=None, resume=False):
+    """Stream a JSONL/CSV corpus through the analyzer into a JSONL results file
+
+    scorer is an EmotionalAnalyzer or a ScoringPool; anything with an
+    analyze_batch(texts, batch_size=...) method works.
+
+    Only one micro-batch is held in memory at a time. After each batch the
+    output is flushed and the checkpoint records how far input and output
+    got, so resume=True continues where an interrupted run stopped.
+    Returns the number of records written.
+    """
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    reader = read_csv if input_format == 'csv' else read_jsonl
+    checkpoint_path = checkpoint_path or f"{output_path}.ckpt"
+
+    state = {'input_path': os.path.abspath(input_path), 'position': 0, 'written': 0, 'output_offset': 0}
+    if resume:
+        saved = load_checkpoint(checkpoint_path)
+        if saved is not None:
+            if saved['input_path'] != state['input_path']:
+                raise ValueError(f"Checkpoint {checkpoint_path} belongs to {saved['input_path']}")
+            state = saved
+            logger.info(f"Resuming after {state['written']} records")
+
+    if hasattr(scorer, 'position'):
+        # Keep a DedupScorer's duplicate_of positions equal to output line numbers
+        scorer.position = state['written']
+
+    mode = 'r+b' if resume and os.path.exists(output_path) else 'wb'
+    started = time.perf_counter()
+    written_this_run = 0
+
+    with open(output_path, mode) as output:
+        # Drop anything written after the last checkpoint
+        output.seek(state['output_offset'])
+        output.truncate()
+
+        for batch in iter_batches(reader(input_path, state['position']), batch_size):
+            texts = [str(record.get(text_field) or '') for record, _ in batch]
+            results = scorer.analyze_batch(texts, batch_size=batch_size)
+
+            for (record, _), text, result in zip(batch, texts, results):
+                row = {'id': record.get(id_field) if id_field else None}
+                if text.strip():
+                    row.update(result)
+                else:
+                    row['error'] = f"missing or empty '{text_field}' field"
+                output.write(json.dumps(row).encode('utf-8') + b'\n')
+
+            output.flush()
+            state['position'] = batch[-1][1]
+            state['written'] += len(batch)
+            state['output_offset'] = output.tell()
+            save_checkpoint(checkpoint_path, state)
+
+            written_this_run += len(batch)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Scored {state['written']} records ({written_this_run / elapsed:.1f} texts/sec)")
+
+    return state['written']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV corpus with EmotionalAnalyzer")
+    parser.add_argument("input", help="JSONL or CSV file to score")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--text-field", default="text", help="Field holding the text (default: text)")
+    parser.add_argument("--id-field", default=None, help="Field copied into each result as 'id'")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None,
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint path (default: OUTPUT.ckpt)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes sharing the loaded models (default: 1)")
+    parser.add_argument("--combined", action="store_true", help="Derive sentiment from the emotion model")
+    parser.add_argument("--backend", default="pytorch", help="Emotion model backend")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL, help="Hub name or local path of the emotion model")
+    parser.add_argument("--bundle", default=None,
+                        help="Load both models from a model_bundle.py directory (no network needed)")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="Analyze one text per near-duplicate cluster at this MinHash similarity (e.g. 0.8)")
+    parser.add_argument("--dedup-memory", type=int, default=100000,
+                        help="Most representative texts kept for near-duplicate lookups (default: 100000)")
+    args = parser.parse_args()
+
+    analyzer = EmotionalAnalyzer(combined=args.combined, backend=args.backend, emotion_model=args.emotion_model,
+                                 bundle=args.bundle)
+    if not analyzer.models_loaded:
+        logger.warning("Models failed to load; scoring with fallback analysis")
+
+    pool = scorer = analyzer
+    if args.processes > 1:
+        pool = scorer = ScoringPool(analyzer, processes=args.processes)
+    if args.dedup_threshold is not None:
+        scorer = DedupScorer(pool, threshold=args.dedup_threshold, max_representatives=args.dedup_memory)
+
+    written = score_corpus(
+        scorer,
+        args.input,
+        args.output,
+        text_field=args.text_field,
+        id_field=args.id_field,
+        input_format=args.format,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume
+    )
+    if pool is not analyzer:
+        pool.close()
+    logger.info(f"Done: {written} records in {args.output}")
+    if args.dedup_threshold is not None:
+        stats = scorer.stats()
+        logger.info(f"Dedup: {stats['duplicates']} of {stats['texts']} texts were near-duplicates "
+                    f"({stats['dedup_ratio']:.1%}); inference took {stats['inference_seconds']:.1f}s, "
+                    f"about {stats['estimated_seconds_saved']:.1f}s saved")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class EmotionScores:
+    """Emotion probabilities for a batch as one (texts, labels) float32 matrix
+
+    Columns follow a fixed label order (label_index maps a label to its
+    column). Primary emotions, intensities, normalization and thresholds are
+    computed for the whole batch at once; the per-text emotion data dicts
+    that the rest of the analyzer uses are only built when a row is indexed.
+    """
+
+    __slots__ = ('labels', 'label_index', 'matrix')
+
+    def __init__(self, labels, matrix):
+        self.labels = tuple(labels)
+        self.label_index = {label: column for column, label in enumerate(self.labels)}
+        self.matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, len(self.labels))
+
+    @classmethod
+    def from_results(cls, results):
+        """Build from pipeline-style lists of {'label', 'score'} dicts"""
+        labels = [item['label'] for item in results[0]]
+        index = {label: column for column, label in enumerate(labels)}
+        matrix = np.zeros((len(results), len(labels)), dtype=np.float32)
+        for row, result in enumerate(results):
+            for item in result:
+                matrix[row, index[item['label']]] = item['score']
+        return cls(labels, matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def __getitem__(self, row):
+        return self.emotion_data(row)
+
+    def __iter__(self):
+        return (self.row_data(scores) for scores in self.matrix.tolist())
+
+    @property
+    def primary_index(self):
+        return self.matrix.argmax(axis=1)
+
+    @property
+    def primary_labels(self):
+        return [self.labels[column] for column in self.primary_index.tolist()]
+
+    @property
+    def primary_scores(self):
+        return self.matrix.max(axis=1)
+
+    @property
+    def intensity(self):
+        # The emotional intensity is the strongest emotion's score
+        return self.matrix.max(axis=1)
+
+    def column(self, label):
+        return self.matrix[:, self.label_index[label]]
+
+    def normalized(self):
+        """Rows rescaled to sum to 1"""
+        totals = self.matrix.sum(axis=1, keepdims=True)
+        return EmotionScores(self.labels, self.matrix / np.maximum(totals, 1e-12))
+
+    def above(self, threshold):
+        """Boolean (texts, labels) mask of scores over threshold"""
+        return self.matrix > threshold
+
+    def combine(self, weights=None, aggregate='mean'):
+        """Collapse all rows into one: weighted 'mean' or element-wise 'max'"""
+        if aggregate == 'max':
+            return EmotionScores(self.labels, self.matrix.max(axis=0))
+        weights = np.ones(len(self.matrix)) if weights is None else np.asarray(weights, dtype=np.float64)
+        return EmotionScores(self.labels, (weights @ self.matrix) / weights.sum())
+
+    def emotion_data(self, row):
+        """The analyzer's emotion data dict for one row, emotions sorted by score"""
+        return self.row_data(self.matrix[row].tolist())
+
+    def row_data(self, scores):
+        # Plain Python floats sort faster than a NumPy argsort over a few labels
+        order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        all_emotions = {self.labels[column]: scores[column] for column in order}
+        primary = self.labels[order[0]]
+
+        return {
+            'primary_emotion': primary,
+            'primary_score': all_emotions[primary],
+            'all_emotions': all_emotions,
+            'emotional_intensity': all_emotions[primary]
+        }
+
+    def to_dicts(self):
+        return [self.row_data(scores) for scores in self.matrix.tolist()]
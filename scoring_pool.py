@@ -0,0 +1,148 @@
+import gc
+import os
+import logging
+import multiprocessing
+
+from emotion_model import EmotionalAnalyzer
+from compact_results import encode_results, decode_results
+
+logger = logging.getLogger(__name__)
+
+# Analyzer used inside each worker process. With the fork start method it is
+# inherited from the parent, so model weights are shared copy-on-write.
+_worker_analyzer = None
+
+
+def _init_worker(analyzer_kwargs, torch_threads):
+    """Prepare a worker: reuse the forked analyzer or load one per process"""
+    global _worker_analyzer
+
+    if torch_threads:
+        try:
+            import torch
+            # One intra-op thread per process avoids oversubscribing the cores
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    if _worker_analyzer is None:
+        _worker_analyzer = EmotionalAnalyzer(**analyzer_kwargs)
+
+    # The cache's SQLite connection and lock must not be shared across processes
+    _worker_analyzer.cache = None
+
+
+def _analyzer_kwargs(analyzer):
+    """Keyword arguments that rebuild an equivalent analyzer in another process"""
+    return {
+        'combined': analyzer.combined,
+        'backend': analyzer.backend,
+        'emotion_model': analyzer.emotion_model,
+        'sentiment_model': analyzer.sentiment_model,
+        'bundle': analyzer.bundle,
+        'topic_engine': analyzer.topic_engine,
+        'topic_extractor': analyzer.topic_extractor,
+        'entity_extractor': analyzer.entity_extractor,
+        'embeddings': analyzer.embeddings,
+        'cascade': analyzer.cascade,
+        'cascade_threshold': analyzer.cascade_threshold,
+        'cascade_margin': analyzer.cascade_margin,
+        'warmup_texts': analyzer.warmup_texts
+    }
+
+
+def _score_chunk(texts):
+    return _worker_analyzer.analyze_batch(texts, batch_size=len(texts))
+
+
+def _score_chunk_compact(texts):
+    # One flat buffer pickles far faster than thousands of nested dicts
+    return encode_results(_score_chunk(texts))
+
+
+class ScoringPool:
+    """Process pool that scores texts with one EmotionalAnalyzer per worker
+
+    Pass an already-loaded analyzer to share its weights with the workers via
+    fork; otherwise each worker builds its own from analyzer_kwargs. Workers
+    that the pool replaces after the fork rebuild the analyzer from its
+    settings, so they keep the same models. Results always come back in
+    input order.
+    """
+
+    def __init__(self, analyzer=None, processes=None, chunk_size=None, torch_threads=1, **analyzer_kwargs):
+        global _worker_analyzer
+
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+        start_methods = multiprocessing.get_all_start_methods()
+        if analyzer is not None:
+            analyzer_kwargs = {**_analyzer_kwargs(analyzer), **analyzer_kwargs}
+
+        if analyzer is not None and 'fork' in start_methods:
+            # A loader thread would not survive the fork, so finish loading first
+            analyzer.wait_until_ready()
+            _worker_analyzer = analyzer
+            context = multiprocessing.get_context('fork')
+            # Keep the garbage collector from touching (and copying) inherited pages
+            gc.freeze()
+        else:
+            if analyzer is not None:
+                logger.warning("fork is unavailable; each worker will load its own models")
+            context = multiprocessing.get_context()
+
+        try:
+            self.pool = context.Pool(
+                self.processes,
+                initializer=_init_worker,
+                initargs=(analyzer_kwargs, torch_threads)
+            )
+        finally:
+            _worker_analyzer = None
+            if analyzer is not None and 'fork' in start_methods:
+                gc.unfreeze()
+
+    def chunks(self, texts, chunk_size):
+        for start in range(0, len(texts), chunk_size):
+            yield texts[start:start + chunk_size]
+
+    def imap(self, texts, chunk_size=None, compact=False):
+        """Yield results in input order as chunks finish
+
+        With compact, workers send back encoded buffers and CompactResult
+        objects are yielded instead of dicts.
+        """
+        texts = list(texts)
+        chunk_size = chunk_size or self.chunk_size or max(1, -(-len(texts) // self.processes))
+        if compact:
+            for buffer in self.pool.imap(_score_chunk_compact, self.chunks(texts, chunk_size)):
+                yield from decode_results(buffer)
+            return
+        for results in self.pool.imap(_score_chunk, self.chunks(texts, chunk_size)):
+            yield from results
+
+    def analyze_batch(self, texts, batch_size=None, workers=None):
+        """Drop-in for EmotionalAnalyzer.analyze_batch, spread across processes
+
+        batch_size and workers are accepted for compatibility; chunking is
+        controlled by the pool's chunk_size.
+        """
+        return list(self.imap(texts))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from emotion_model import EmotionalAnalyzer, EMOTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the batcher cannot accept more work"""
+
+
+class MicroBatcher:
+    """Coalesce concurrent analysis requests into model batches
+
+    Requests wait in a bounded queue. A single consumer takes up to
+    max_batch_size texts, waiting at most max_wait seconds for the batch to
+    fill, and runs analyze_batch on a dedicated executor so the event loop
+    never blocks on inference.
+    """
+
+    def __init__(self, analyzer, max_batch_size=32, max_wait=0.01, max_queue=1024):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # One inference thread: batches run back to back, never concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.consumer = None
+        self.batches = 0
+        self.texts = 0
+
+    def start(self):
+        self.consumer = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.consumer is not None:
+            self.consumer.cancel()
+            try:
+                await self.consumer
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    def free_slots(self):
+        return self.queue.maxsize - self.queue.qsize()
+
+    def submit(self, texts):
+        """Queue texts for analysis and return one future per text
+
+        Raises QueueFullError without queueing anything if they don't all fit.
+        """
+        if len(texts) > self.free_slots():
+            raise QueueFullError(f"queue full ({self.queue.qsize()}/{self.queue.maxsize})")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+        return futures
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Skip texts whose caller already went away
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.analyzer.analyze_batch, texts, len(texts)
+                )
+            except Exception as e:
+                logger.error(f"Error in batch analysis: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def read_texts(payload, max_texts):
+    """Validate an /analyze_batch body and return its texts"""
+    texts = payload.get('texts') if isinstance(payload, dict) else None
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        raise web.HTTPBadRequest(text="expected a JSON body like {\"texts\": [\"...\"]}")
+    if len(texts) > max_texts:
+        raise web.HTTPRequestEntityTooLarge(max_size=max_texts, actual_size=len(texts))
+    return texts
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="request body must be JSON")
+
+
+async def analyze_texts(request, texts):
+    batcher = request.app['batcher']
+    try:
+        futures = batcher.submit(texts)
+    except QueueFullError as e:
+        raise web.HTTPServiceUnavailable(text=str(e), headers={'Retry-After': '1'})
+    return await asyncio.gather(*futures)
+
+
+async def handle_analyze(request):
+    payload = await read_json(request)
+    text = payload.get('text') if isinstance(payload, dict) else None
+    if not isinstance(text, str) or not text.strip():
+        raise web.HTTPBadRequest(text="expected a JSON body like {\"text\": \"...\"}")
+
+    results = await analyze_texts(request, [text])
+    return web.json_response(results[0])
+
+
+async def handle_analyze_batch(request):
+    payload = await read_json(request)
+    texts = read_texts(payload, request.app['max_texts_per_request'])
+
+    results = await analyze_texts(request, texts)
+    return web.json_response({'results': results})
+
+
+async def handle_health(request):
+    analyzer = request.app['analyzer']
+    batcher = request.app['batcher']
+    return web.json_response({
+        'load_state': analyzer.load_state,
+        'models_loaded': analyzer.models_loaded,
+        'load_seconds': analyzer.load_seconds,
+        'warmup_seconds': analyzer.warmup_seconds,
+        'queue_depth': batcher.queue.qsize(),
+        'batches': batcher.batches,
+        'texts': batcher.texts
+    })
+
+
+async def handle_metrics(request):
+    analyzer = request.app['analyzer']
+    return web.Response(
+        text=analyzer.metrics.registry.render_prometheus(),
+        content_type='text/plain',
+        charset='utf-8'
+    )
+
+
+def create_app(analyzer, max_batch_size=32, max_wait=0.01, max_queue=1024, max_texts_per_request=256):
+    """Build the aiohttp application around an existing analyzer"""
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app['analyzer'] = analyzer
+    app['max_texts_per_request'] = max_texts_per_request
+
+    async def start_batcher(app):
+        app['batcher'] = MicroBatcher(analyzer, max_batch_size, max_wait, max_queue)
+        app['batcher'].start()
+
+    async def stop_batcher(app):
+        await app['batcher'].stop()
+
+    app.on_startup.append(start_batcher)
+    app.on_cleanup.append(stop_batcher)
+    app.router.add_post('/analyze', handle_analyze)
+    app.router.add_post('/analyze_batch', handle_analyze_batch)
+    app.router.add_get('/health', handle_health)
+    app.router.add_get('/metrics', handle_metrics)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP scoring service for EmotionalAnalyzer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="How long to wait for a batch to fill (default: 10ms)")
+    parser.add_argument("--max-queue", type=int, default=1024,
+                        help="Queued texts before requests get 503 (default: 1024)")
+    parser.add_argument("--max-texts-per-request", type=int, default=256)
+    parser.add_argument("--combined", action="store_true", help="Derive sentiment from the emotion model")
+    parser.add_argument("--backend", default="pytorch", help="Emotion model backend")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL, help="Hub name or local path of the emotion model")
+    parser.add_argument("--bundle", default=None,
+                        help="Load both models from a model_bundle.py directory (no network needed)")
+    parser.add_argument("--background", action="store_true",
+                        help="Start serving fallback results while models load")
+    args = parser.parse_args()
+
+    analyzer = EmotionalAnalyzer(
+        combined=args.combined,
+        backend=args.backend,
+        emotion_model=args.emotion_model,
+        bundle=args.bundle,
+        background=args.background
+    )
+    app = create_app(
+        analyzer,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        max_texts_per_request=args.max_texts_per_request
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
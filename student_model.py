@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import numpy as np
+
+from inference_backends import TokenizedClassifier, softmax
+from emotion_model import EmotionalAnalyzer, EMOTION_MODEL
+
+logger = logging.getLogger(__name__)
+
+STUDENT_FORMAT = 1
+# Hashed feature space; 2**18 columns x 7 labels of float32 weights is 7 MB
+DEFAULT_FEATURES = 2 ** 18
+# Keeps apostrophes inside words so "don't" and "can't" survive as features
+TOKEN_PATTERN = r"(?u)\b\w[\w']*\b"
+# Teacher probabilities below this are dropped from the soft targets
+MIN_TARGET_WEIGHT = 0.05
+
+
+class StudentClassifier(TokenizedClassifier):
+    """Hashed word n-grams and a linear layer distilled from the emotion model
+
+    A drop-in for the transformer classifiers (the 'student' backend): it is
+    called like a text-classification pipeline and has probabilities() over
+    the same emotion labels. A whole batch is one sparse hashing transform
+    and one sparse-dense product, so it scores thousands of texts per
+    second on one core. It has no tokenizer and no encoder embeddings.
+    """
+
+    def __init__(self, labels, coef, intercept, n_features=DEFAULT_FEATURES, ngram_range=(1, 2), all_scores=True):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.preprocessor = None
+        self.labels = list(labels)
+        self.all_scores = all_scores
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        # (features, labels), so a sparse batch multiplies it directly
+        self.coef = np.asarray(coef, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=self.ngram_range,
+            token_pattern=TOKEN_PATTERN,
+            alternate_sign=False,
+            norm='l2',
+            dtype=np.float32
+        )
+
+    def features(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.vectorizer.transform(texts)
+
+    def probabilities(self, texts, batch_size=None, pooled=False):
+        """(texts, labels) float32 softmax matrix; embeddings are always None"""
+        logits = self.features(texts) @ self.coef + self.intercept
+        return softmax(np.asarray(logits)).astype(np.float32), None
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'coef.npy'), self.coef)
+        np.save(os.path.join(directory, 'intercept.npy'), self.intercept)
+        with open(os.path.join(directory, 'student.json'), 'w') as meta_file:
+            json.dump({'format': STUDENT_FORMAT, 'labels': self.labels, 'n_features': self.n_features,
+                       'ngram_range': list(self.ngram_range)}, meta_file)
+
+    @classmethod
+    def load(cls, directory, all_scores=True):
+        """Load a saved student; the weights are memory-mapped"""
+        with open(os.path.join(directory, 'student.json')) as meta_file:
+            meta = json.load(meta_file)
+        if meta['format'] != STUDENT_FORMAT:
+            raise ValueError(f"Unsupported student model format: {meta['format']}")
+        return cls(
+            meta['labels'],
+            np.load(os.path.join(directory, 'coef.npy'), mmap_mode='r'),
+            np.load(os.path.join(directory, 'intercept.npy')),
+            meta['n_features'],
+            meta['ngram_range'],
+            all_scores
+        )
+
+
+def soft_targets(probs, min_weight=MIN_TARGET_WEIGHT):
+    """Expand teacher probabilities into (rows, label indices, weights)
+
+    Fitting a logistic regression on every (text, label) pair weighted by
+    the teacher's probability minimizes the cross-entropy against the
+    teacher's full distribution, not just its top label. Tiny probabilities
+    are dropped and each row's remaining weights renormalized.
+    """
+    probs = np.where(probs >= min_weight, probs, 0.0)
+    # Always keep the top label, even for a very flat distribution
+    probs[np.arange(len(probs)), probs.argmax(axis=1)] = np.maximum(probs.max(axis=1), 1e-6)
+    probs = probs / probs.sum(axis=1, keepdims=True)
+    rows, columns = np.nonzero(probs)
+    return rows, columns, probs[rows, columns]
+
+
+def train_student(texts, teacher_probs, labels, n_features=DEFAULT_FEATURES, ngram_range=(1, 2), C=10.0,
+                  max_iter=300):
+    """Fit a StudentClassifier to teacher probabilities over labels"""
+    from sklearn.linear_model import LogisticRegression
+
+    student = StudentClassifier(labels, np.zeros((n_features, len(labels))), np.zeros(len(labels)),
+                                n_features, ngram_range)
+    rows, targets, weights = soft_targets(np.asarray(teacher_probs, dtype=np.float64))
+    if len(np.unique(targets)) < 2:
+        raise ValueError("The teacher labelled every text the same; the student needs at least two labels")
+
+    features = student.features(texts)
+    model = LogisticRegression(C=C, max_iter=max_iter)
+    model.fit(features[rows], targets, sample_weight=weights)
+
+    coef = model.coef_
+    intercept = model.intercept_
+    if len(model.classes_) == 2:
+        # Binary models keep one weight row; split it into a symmetric softmax pair
+        coef = np.vstack([-coef / 2, coef / 2])
+        intercept = np.array([-intercept[0] / 2, intercept[0] / 2])
+
+    # Labels the teacher never predicted get no weights and a very low bias
+    student.coef = np.zeros((n_features, len(labels)), dtype=np.float32)
+    student.intercept = np.full(len(labels), -30.0, dtype=np.float32)
+    student.coef[:, model.classes_] = coef.T
+    student.intercept[model.classes_] = intercept
+    return student
+
+
+def label_corpus(analyzer, texts, batch_size=32):
+    """Teacher probabilities for texts: (labels, (texts, labels) matrix)"""
+    if not analyzer.models_loaded:
+        raise RuntimeError("Labelling a corpus needs the emotion model loaded")
+    scores = analyzer.score_with_model(texts, batch_size)
+    return list(scores.labels), scores.matrix
+
+
+def agreement_report(student, texts, teacher_probs, labels):
+    """How closely the student matches the teacher on texts
+
+    agreement is the share of texts where both pick the same primary
+    emotion; per label, recall is the share of the teacher's picks the
+    student matched and precision the share of the student's picks the
+    teacher agrees with.
+    """
+    start = time.perf_counter()
+    student_probs, _ = student.probabilities(texts)
+    seconds = time.perf_counter() - start
+
+    # Student columns may be in another order than the teacher's labels
+    columns = [student.labels.index(label) for label in labels]
+    student_probs = student_probs[:, columns]
+    teacher = np.asarray(teacher_probs).argmax(axis=1)
+    predicted = student_probs.argmax(axis=1)
+
+    per_label = {}
+    for column, label in enumerate(labels):
+        teacher_count = int((teacher == column).sum())
+        student_count = int((predicted == column).sum())
+        matched = int(((teacher == column) & (predicted == column)).sum())
+        per_label[label] = {
+            'teacher_count': teacher_count,
+            'student_count': student_count,
+            'recall': matched / teacher_count if teacher_count else None,
+            'precision': matched / student_count if student_count else None
+        }
+
+    return {
+        'texts': len(texts),
+        'agreement': float((teacher == predicted).mean()),
+        'mean_abs_diff': float(np.abs(student_probs - teacher_probs).mean()),
+        'texts_per_sec': len(texts) / seconds if seconds else 0.0,
+        'per_label': per_label
+    }
+
+
+def read_texts(path, text_field='text', input_format=None, limit=None):
+    """Non-empty texts from a JSONL or CSV corpus, as read by score_corpus"""
+    from score_corpus import read_csv, read_jsonl
+
+    input_format = input_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    reader = read_csv if input_format == 'csv' else read_jsonl
+    texts = []
+    for record, _ in reader(path, 0):
+        text = str(record.get(text_field) or '')
+        if text.strip():
+            texts.append(text)
+            if limit and len(texts) >= limit:
+                break
+    return texts
+
+
+def print_report(report):
+    print(f"{report['texts']} texts: agreement {report['agreement']:.3f}, "
+          f"mean |p_student - p_teacher| {report['mean_abs_diff']:.4f}, "
+          f"student {report['texts_per_sec']:.0f} texts/sec")
+    for label, stats in report['per_label'].items():
+        recall = f"{stats['recall']:.3f}" if stats['recall'] is not None else "  -  "
+        precision = f"{stats['precision']:.3f}" if stats['precision'] is not None else "  -  "
+        print(f"  {label:<10} teacher {stats['teacher_count']:6d}  student {stats['student_count']:6d}  "
+              f"recall {recall}  precision {precision}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil the emotion model into a fast hashed n-gram student")
+    parser.add_argument("command", choices=("train", "report"),
+                        help="train a student on a corpus, or report a saved student's agreement with the teacher")
+    parser.add_argument("corpus", help="JSONL or CSV file of texts")
+    parser.add_argument("student", help="Directory the student is saved to / loaded from")
+    parser.add_argument("--text-field", default="text", help="Field holding the text (default: text)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None,
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many texts")
+    parser.add_argument("--holdout", type=float, default=0.1,
+                        help="Share of texts kept out of training for the agreement report (default: 0.1)")
+    parser.add_argument("--backend", default="onnx", help="Teacher emotion model backend (default: onnx)")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL, help="Hub name or local path of the teacher")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES, help="Hashed feature count")
+    parser.add_argument("--ngrams", type=int, default=2, help="Longest word n-gram (default: 2)")
+    parser.add_argument("--C", type=float, default=10.0, help="Inverse regularization strength (default: 10)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    texts = read_texts(args.corpus, args.text_field, args.format, args.limit)
+    if not texts:
+        logger.error(f"No texts found in {args.corpus}")
+        return 1
+
+    teacher = EmotionalAnalyzer(combined=True, backend=args.backend, emotion_model=args.emotion_model)
+    if not teacher.models_loaded:
+        logger.error("The teacher model failed to load")
+        return 1
+
+    start = time.perf_counter()
+    labels, teacher_probs = label_corpus(teacher, texts, args.batch_size)
+    logger.info(f"Teacher labelled {len(texts)} texts in {time.perf_counter() - start:.1f}s")
+
+    if args.command == 'report':
+        student = StudentClassifier.load(args.student)
+        print_report(agreement_report(student, texts, teacher_probs, labels))
+        return 0
+
+    order = list(range(len(texts)))
+    random.Random(0).shuffle(order)
+    held_out = int(len(texts) * args.holdout)
+    test, train = order[:held_out], order[held_out:]
+
+    start = time.perf_counter()
+    student = train_student([texts[i] for i in train], teacher_probs[train], labels,
+                            args.features, (1, args.ngrams), args.C)
+    logger.info(f"Trained the student on {len(train)} texts in {time.perf_counter() - start:.1f}s")
+    student.save(args.student)
+    logger.info(f"Student saved to {args.student}; use it with backend='student', emotion_model='{args.student}'")
+
+    if test:
+        print_report(agreement_report(student, [texts[i] for i in test], teacher_probs[test], labels))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,18 @@
+import os
+
+# Every test runs against tiny local models; never reach for the Hub
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import pytest
+
+from benchmark import build_tiny_model, EMOTION_LABELS, SENTIMENT_LABELS
+
+
+@pytest.fixture(scope="session")
+def tiny_models(tmp_path_factory):
+    """Paths of tiny random emotion and sentiment models, built once per run"""
+    root = tmp_path_factory.mktemp("tiny-models")
+    return {
+        'emotion': build_tiny_model(str(root / "emotion"), EMOTION_LABELS),
+        'sentiment': build_tiny_model(str(root / "sentiment"), SENTIMENT_LABELS)
+    }
@@ -0,0 +1,38 @@
+import numpy as np
+
+from benchmark import make_texts
+from emotion_model import EmotionalAnalyzer
+
+
+def test_analyze_chunked_with_embeddings(tiny_models):
+    analyzer = EmotionalAnalyzer(combined=True, embeddings=True, emotion_model=tiny_models['emotion'],
+                                 warmup_texts=[])
+    assert analyzer.models_loaded
+    text = make_texts('long', 1)[0][:3000]
+
+    result = analyzer.analyze_chunked(text, window_chars=256, batch_size=4)
+
+    assert len(result['timeline']) > 4
+    assert abs(sum(result['emotion']['all_emotions'].values()) - 1.0) < 1e-3
+    assert np.isfinite(result['embedding']).all()
+
+
+def test_fallback_request_builds_one_textblob(tmp_path, monkeypatch):
+    import emotion_model
+
+    blobs = []
+
+    class CountingBlob(emotion_model.TextBlob):
+        def __init__(self, text, *args, **kwargs):
+            blobs.append(text)
+            super().__init__(text, *args, **kwargs)
+
+    monkeypatch.setattr(emotion_model, 'TextBlob', CountingBlob)
+    analyzer = EmotionalAnalyzer(emotion_model=str(tmp_path / "missing"), topic_engine='fast')
+    assert analyzer.load_state == 'failed'
+
+    result = analyzer.analyze("I'm so happy and excited about the trip with Sarah Johnson!")
+
+    assert blobs == ["I'm so happy and excited about the trip with Sarah Johnson!"]
+    assert result['emotion']['primary_emotion'] == 'joy'
+    assert result['context']['sentiment'] == 'POSITIVE'
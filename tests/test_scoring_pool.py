@@ -0,0 +1,26 @@
+import os
+import time
+
+import scoring_pool
+from emotion_model import EmotionalAnalyzer
+from scoring_pool import ScoringPool
+
+
+def _worker_identity():
+    return os.getpid(), scoring_pool._worker_analyzer.model_identity()
+
+
+def test_replaced_worker_keeps_parent_models(tiny_models):
+    analyzer = EmotionalAnalyzer(combined=True, emotion_model=tiny_models['emotion'], warmup_texts=[])
+    with ScoringPool(analyzer, processes=1) as pool:
+        first_pid, identity = pool.pool.apply(_worker_identity)
+        assert identity == analyzer.model_identity()
+
+        # The worker dies between tasks; the pool starts a fresh one
+        pool.pool.apply_async(os._exit, (0,))
+        time.sleep(0.5)
+        pid, identity = pool.pool.apply(_worker_identity)
+
+        assert pid != first_pid
+        assert identity == analyzer.model_identity()
+        assert len(pool.analyze_batch(["I'm so happy today", "I feel lonely"])) == 2
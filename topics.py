@@ -0,0 +1,130 @@
+import re
+import json
+import math
+from collections import Counter
+
+# Words keep their case here; callers lowercase as needed. Punctuation tokens
+# mark clause boundaries for negation scopes and phrase chunking.
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+(?:'[A-Za-z]+)?|[.,;:!?]")
+PUNCTUATION = frozenset('.,;:!?')
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each even ever every few for from further get gets getting got had hadn't has hasn't have haven't
+having he he'd he'll he's her here here's hers herself him himself his how how's i i'd i'll i'm i've if
+in into is isn't it it's its itself just keep kept know let's like lately made make makes many me might
+more most much must mustn't my myself never no nor not now of off on once one only or other ought our
+ours ourselves out over own quite rather really same say said she she'd she'll she's should shouldn't
+so some still such than that that's the their theirs them themselves then there there's these they
+they'd they'll they're they've thing things think this those though through to today tomorrow too
+under until up upon us very was wasn't we we'd we'll we're we've were weren't what what's when when's
+where where's which while who who's whom why why's will with won't would wouldn't yesterday yet you
+you'd you'll you're you've your yours yourself yourselves feel feels feeling felt
+""".split())
+
+
+class TokenizedText:
+    """One tokenization of a text, shared by topics, keywords and entities"""
+
+    __slots__ = ('text', 'tokens', 'lower')
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = TOKEN_PATTERN.findall(text)
+        self.lower = [token.lower() for token in self.tokens]
+
+
+class TopicExtractor:
+    """Keyphrase extractor standing in for TextBlob noun phrases
+
+    Candidate phrases are runs of up to max_phrase_len non-stopwords between
+    stopwords and punctuation. With an IDF table (from fit() or load()) a
+    phrase scores the sum of its words' IDF; without one it gets the RAKE
+    degree/frequency score. Topics come back lowercased, like
+    TextBlob.noun_phrases.
+    """
+
+    def __init__(self, idf=None, max_phrase_len=3, stopwords=STOPWORDS):
+        self.idf = idf
+        self.default_idf = max(idf.values()) if idf else 0.0
+        self.max_phrase_len = max_phrase_len
+        self.stopwords = stopwords
+
+    def candidates(self, lower_tokens):
+        """Split the token stream into candidate phrases (tuples of words)"""
+        phrases = []
+        run = []
+        for token in lower_tokens + ['.']:
+            if token in PUNCTUATION or token in self.stopwords or token.isdigit() or len(token) < 2:
+                while run:
+                    phrases.append(tuple(run[:self.max_phrase_len]))
+                    run = run[self.max_phrase_len:]
+                continue
+            run.append(token)
+        return phrases
+
+    def score(self, phrases):
+        if self.idf is not None:
+            return {phrase: sum(self.idf.get(word, self.default_idf) for word in phrase) for phrase in phrases}
+
+        frequency = Counter()
+        degree = Counter()
+        for phrase in phrases:
+            for word in phrase:
+                frequency[word] += 1
+                degree[word] += len(phrase)
+        return {phrase: sum(degree[word] / frequency[word] for word in phrase) for phrase in phrases}
+
+    def extract(self, text, limit=5):
+        """Top topics for a text or TokenizedText"""
+        tokenized = text if isinstance(text, TokenizedText) else TokenizedText(text)
+        return self.rank(self.candidates(tokenized.lower), limit)
+
+    def rank(self, phrases, limit=5):
+        """Top topics from candidate phrases in text order
+
+        Candidates never span punctuation, so the phrases of consecutive
+        sentences can be concatenated and ranked as one text.
+        """
+        if not phrases:
+            return []
+
+        scores = self.score(phrases)
+        first_seen = {}
+        for position, phrase in enumerate(phrases):
+            first_seen.setdefault(phrase, position)
+
+        ranked = sorted(first_seen, key=lambda phrase: (-scores[phrase], first_seen[phrase]))
+        return [" ".join(phrase) for phrase in ranked[:limit]]
+
+    def extract_batch(self, texts, limit=5):
+        return [self.extract(text, limit) for text in texts]
+
+    def fit(self, texts):
+        """Build the IDF table from a corpus of texts"""
+        document_frequency = Counter()
+        documents = 0
+        for text in texts:
+            tokenized = text if isinstance(text, TokenizedText) else TokenizedText(text)
+            document_frequency.update({token for token in tokenized.lower if token not in PUNCTUATION})
+            documents += 1
+
+        self.idf = {
+            word: math.log((1 + documents) / (1 + count)) + 1
+            for word, count in document_frequency.items()
+        }
+        self.default_idf = math.log(1 + documents) + 1
+        return self
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as idf_file:
+            json.dump({'idf': self.idf, 'default_idf': self.default_idf}, idf_file)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, encoding='utf-8') as idf_file:
+            data = json.load(idf_file)
+        extractor = cls(data['idf'], **kwargs)
+        extractor.default_idf = data['default_idf']
+        return extractor